@@ -2,7 +2,7 @@
 Pydantic models for scheduled crawling
 """
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional
+from typing import List, Optional
 from datetime import time
 from uuid import UUID
 
@@ -14,6 +14,7 @@ class CrawlFolderCreate(BaseModel):
     schedule_time: str = Field(..., pattern="^([01]?[0-9]|2[0-3]):[0-5][0-9](:[0-5][0-9])?$", description="Schedule time (HH:MM or HH:MM:SS)")
     schedule_day: Optional[int] = Field(None, ge=0, le=6, description="Day of week (0=Sunday, 6=Saturday)")
     max_depth: int = Field(default=2, ge=1, le=5, description="Maximum crawl depth (1-5)")
+    recrawl_budget: Optional[int] = Field(None, ge=1, description="Pages revisited per scheduled run (adaptive recrawl)")
     enabled: bool = Field(default=True, description="Whether the folder is enabled")
 
     @field_validator("schedule_day")
@@ -35,6 +36,7 @@ class CrawlFolderUpdate(BaseModel):
     schedule_time: Optional[str] = Field(None, pattern="^([01]?[0-9]|2[0-3]):[0-5][0-9](:[0-5][0-9])?$")
     schedule_day: Optional[int] = Field(None, ge=0, le=6)
     max_depth: Optional[int] = Field(None, ge=1, le=5)
+    recrawl_budget: Optional[int] = Field(None, ge=1)
     enabled: Optional[bool] = None
 
 
@@ -46,6 +48,7 @@ class CrawlFolderResponse(BaseModel):
     schedule_time: str
     schedule_day: Optional[int]
     max_depth: int = 2  # Default value for backward compatibility
+    recrawl_budget: Optional[int] = None
     enabled: bool
     created_at: str
     updated_at: str
@@ -58,6 +61,10 @@ class ScheduledCrawlSiteCreate(BaseModel):
     url: str = Field(..., pattern="^https?://", description="Site URL")
     description: Optional[str] = Field(None, max_length=500, description="Site description")
     enabled: bool = Field(default=True, description="Whether the site is enabled")
+    resource_allowlist: List[str] = Field(
+        default_factory=list,
+        description="Resource types (e.g. 'stylesheet') or hosts the crawler browser should not block"
+    )
 
 
 class ScheduledCrawlSiteUpdate(BaseModel):
@@ -66,6 +73,7 @@ class ScheduledCrawlSiteUpdate(BaseModel):
     url: Optional[str] = Field(None, pattern="^https?://")
     description: Optional[str] = Field(None, max_length=500)
     enabled: Optional[bool] = None
+    resource_allowlist: Optional[List[str]] = None
 
 
 class ScheduledCrawlSiteResponse(BaseModel):
@@ -76,6 +84,7 @@ class ScheduledCrawlSiteResponse(BaseModel):
     url: str
     description: Optional[str]
     enabled: bool
+    resource_allowlist: List[str] = []  # Default value for backward compatibility
     created_at: str
     updated_at: str
 
@@ -88,6 +97,7 @@ class FolderWithSitesResponse(BaseModel):
     schedule_time: str
     schedule_day: Optional[int]
     max_depth: int = 2  # Default value for backward compatibility
+    recrawl_budget: Optional[int] = None
     enabled: bool
     created_at: str
     updated_at: str
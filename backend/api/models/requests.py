@@ -4,6 +4,7 @@ from pydantic import BaseModel, HttpUrl
 class CrawlRequest(BaseModel):
     root_url: HttpUrl
     max_depth: int = 2
+    distributed: bool = False  # 큰 사이트를 여러 크롤러 워커로 나눠서 크롤링
 
 
 class ChatRequest(BaseModel):
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from api.models import ChatRequest, ChatResponse
 from services.rag import RAGService
 import structlog
+import json
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 logger = structlog.get_logger()
@@ -35,4 +37,48 @@ async def chat(request: ChatRequest):
 
     except Exception as e:
         logger.error("Failed to generate answer", error=str(e))
-        raise HTTPException(status_code=500, detail="Failed to generate answer")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Failed to generate answer")
+
+
+def _format_sse(event: str, data) -> str:
+    """Format a single Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Answer user questions using RAG, streamed as Server-Sent Events
+
+    Events: `sources` (list of URLs, sent right after retrieval),
+    `token` (answer text chunks), `done`, or `error`
+    """
+    async def event_stream():
+        try:
+            async for event in rag_service.stream_answer(
+                question=request.question,
+                mode=request.mode,
+                user_id=request.user_id
+            ):
+                yield _format_sse(event["event"], event["data"])
+
+            logger.info(
+                "Chat stream completed",
+                question=request.question,
+                mode=request.mode,
+                user_id=request.user_id
+            )
+
+        except Exception as e:
+            # Headers are already sent, so report the failure in-band
+            logger.error("Failed to stream answer", question=request.question, error=str(e))
+            yield _format_sse("error", "Failed to generate answer")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # nginx 프록시 버퍼링 비활성화
+        }
+    )
@@ -36,14 +36,16 @@ async def trigger_crawl(request: CrawlRequest):
         crawl_website.delay(
             task_id=task_id,
             root_url=str(request.root_url),
-            max_depth=request.max_depth
+            max_depth=request.max_depth,
+            distributed=request.distributed
         )
         
         logger.info(
             "Crawl task triggered",
             task_id=task_id,
             root_url=str(request.root_url),
-            max_depth=request.max_depth
+            max_depth=request.max_depth,
+            distributed=request.distributed
         )
         
         return CrawlResponse(task_id=task_id)
@@ -598,7 +600,9 @@ async def execute_folder_crawl(folder_id: str):
             crawl_website.delay(
                 task_id=f"{task_id}_{site['id']}",
                 root_url=site["url"],
-                max_depth=folder_max_depth
+                max_depth=folder_max_depth,
+                resource_allowlist=site.get("resource_allowlist") or None,
+                discovery_mode=settings.crawl_discovery_mode
             )
             logger.info(f"Queued crawl for site: {site['name']} ({site['url']}) with max_depth={folder_max_depth}")
 
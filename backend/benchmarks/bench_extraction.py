@@ -0,0 +1,150 @@
+"""
+HTML 추출 마이크로벤치마크: 기존 BeautifulSoup(html.parser) 경로 vs services.extraction
+
+저장된 페이지로 실행 (backend 디렉터리에서):
+    python benchmarks/bench_extraction.py --save https://cs.ewha.ac.kr https://oia.ewha.ac.kr
+    python benchmarks/bench_extraction.py --repeat 20 --workers 4
+
+--save는 페이지를 benchmarks/pages/ (또는 --pages)에 저장하고, 이후 실행은 저장된 파일만 사용합니다.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, List, Tuple
+from urllib.parse import urljoin, urlsplit
+import argparse
+import multiprocessing
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from services.extraction import extract_page  # noqa: E402
+
+DEFAULT_PAGES_DIR = Path(__file__).resolve().parent / "pages"
+
+SKIPPED_EXTENSIONS_RE = re.compile(r'\.(pdf|jpg|jpeg|png|gif|zip|doc|docx|xls|xlsx|ppt|pptx)$', re.IGNORECASE)
+
+
+def legacy_extract(html_content: str, base_url: str) -> Tuple[str, List[str]]:
+    """The crawler's previous extraction: one html.parser parse for text, another for links"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for script in soup(["script", "style", "nav", "footer", "header"]):
+        script.decompose()
+    main_content = None
+    for tag in ['main', 'article', 'div[role="main"]', '.content', '#content']:
+        main_content = soup.select_one(tag)
+        if main_content:
+            break
+    if not main_content:
+        main_content = soup.body if soup.body else soup
+    text = main_content.get_text(separator='\n', strip=True)
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    text = '\n'.join(lines)
+
+    soup = BeautifulSoup(html_content, 'html.parser')
+    links = []
+    for anchor in soup.select('a[href]'):
+        href = anchor.get('href', '').strip()
+        if not href or href.startswith('#') or href.lower().startswith('javascript:'):
+            continue
+        absolute_url = urljoin(base_url, href)
+        if SKIPPED_EXTENSIONS_RE.search(absolute_url):
+            continue
+        links.append(absolute_url)
+    return text, links
+
+
+def unified_extract(html_content: str, base_url: str) -> Tuple[str, List[str]]:
+    page = extract_page(html_content, base_url)
+    return page.text, page.links
+
+
+def save_pages(urls: List[str], pages_dir: Path) -> None:
+    import httpx
+
+    pages_dir.mkdir(parents=True, exist_ok=True)
+    with httpx.Client(follow_redirects=True, timeout=30) as client:
+        for url in urls:
+            response = client.get(url)
+            response.raise_for_status()
+            parts = urlsplit(str(response.url))
+            name = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{parts.netloc}{parts.path}".rstrip("/")) or "index"
+            (pages_dir / f"{name}.html").write_text(response.text, encoding="utf-8")
+            # The page URL is kept next to the HTML so relative links resolve the same way
+            (pages_dir / f"{name}.url").write_text(str(response.url), encoding="utf-8")
+            print(f"saved {response.url} ({len(response.text) // 1024} KB)")
+
+
+def load_pages(pages_dir: Path) -> List[Tuple[str, str, str]]:
+    """[(name, base url, html)]"""
+    pages = []
+    for path in sorted(pages_dir.glob("*.html")):
+        url_path = path.with_suffix(".url")
+        base_url = url_path.read_text(encoding="utf-8").strip() if url_path.exists() else f"https://{path.stem}/"
+        pages.append((path.stem, base_url, path.read_text(encoding="utf-8")))
+    return pages
+
+
+def time_per_page(extract: Callable, pages, repeat: int) -> List[float]:
+    """Median milliseconds per page"""
+    results = []
+    for _, base_url, html_content in pages:
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            extract(html_content, base_url)
+            samples.append((time.perf_counter() - start) * 1000)
+        results.append(statistics.median(samples))
+    return results
+
+
+def pool_throughput(pages, repeat: int, workers: int) -> float:
+    """Pages per second through a spawn process pool (the crawler's setup)"""
+    jobs = [(html_content, base_url) for _, base_url, html_content in pages] * repeat
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        list(pool.map(extract_page, *zip(*jobs[:workers])))  # warm up the workers
+        start = time.perf_counter()
+        list(pool.map(extract_page, *zip(*jobs), chunksize=1))
+        elapsed = time.perf_counter() - start
+    return len(jobs) / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=Path, default=DEFAULT_PAGES_DIR, help="directory of saved pages")
+    parser.add_argument("--save", nargs="+", metavar="URL", help="download pages into --pages first")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=0, help="also measure process-pool throughput")
+    args = parser.parse_args()
+
+    if args.save:
+        save_pages(args.save, args.pages)
+
+    pages = load_pages(args.pages)
+    if not pages:
+        sys.exit(f"No saved pages in {args.pages}; run with --save URL ... first")
+
+    legacy = time_per_page(legacy_extract, pages, args.repeat)
+    unified = time_per_page(unified_extract, pages, args.repeat)
+
+    print(f"{'page':<40} {'KB':>6} {'legacy ms':>10} {'unified ms':>11} {'speedup':>8}  same text/links")
+    for (name, base_url, html_content), old_ms, new_ms in zip(pages, legacy, unified):
+        old_text, old_links = legacy_extract(html_content, base_url)
+        new_text, new_links = unified_extract(html_content, base_url)
+        print(
+            f"{name[:40]:<40} {len(html_content) // 1024:>6} {old_ms:>10.2f} {new_ms:>11.2f} "
+            f"{old_ms / new_ms:>7.1f}x  {old_text == new_text}/{old_links == new_links}"
+        )
+    print(f"{'total':<40} {'':>6} {sum(legacy):>10.2f} {sum(unified):>11.2f} {sum(legacy) / sum(unified):>7.1f}x")
+
+    if args.workers:
+        rate = pool_throughput(pages, args.repeat, args.workers)
+        print(f"process pool ({args.workers} workers): {rate:.0f} pages/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,10 @@ celery_app = Celery(
 
 # Configure Celery
 celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
+    # 메시지는 zlib 압축 msgpack (큰 페이지 텍스트는 page_store에 두고 해시만 전달)
+    task_serializer="msgpack",
+    task_compression="zlib",
+    accept_content=["msgpack", "json"],
     result_serializer="json",
     timezone="Asia/Seoul",
     enable_utc=False,
@@ -27,5 +29,6 @@ celery_app.conf.update(
         'process_url_for_embedding': {'queue': 'embedding'},
         'process_url_for_embedding_incremental': {'queue': 'embedding'},
         'process_url_for_embedding_smart': {'queue': 'embedding'},
+        'process_url_for_embedding_smart_batch': {'queue': 'embedding'},
     },
 )
\ No newline at end of file
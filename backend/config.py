@@ -29,6 +29,10 @@ class Settings(BaseSettings):
     redis_host: str = Field(default="localhost", env="REDIS_HOST")
     redis_port: int = Field(default=6379, env="REDIS_PORT")
     redis_db: int = Field(default=0, env="REDIS_DB")
+    # 지워지면 안 되는 상태(분산 크롤 프론티어)용 Redis - noeviction 인스턴스 (비우면 REDIS_HOST 사용)
+    state_redis_host: str = Field(default="", env="STATE_REDIS_HOST")
+    state_redis_port: int = Field(default=6379, env="STATE_REDIS_PORT")
+    state_redis_db: int = Field(default=0, env="STATE_REDIS_DB")
     
     # API Server
     api_host: str = Field(default="0.0.0.0", env="API_HOST")
@@ -45,11 +49,21 @@ class Settings(BaseSettings):
         return f"redis://{self.redis_host}:{self.redis_port}/{self.redis_db}"
     
     # Text Processing
-    chunk_size: int = Field(default=1000, env="CHUNK_SIZE")
-    chunk_overlap: int = Field(default=100, env="CHUNK_OVERLAP")
+    # 청크 길이는 임베딩 모델(bge-m3) 토큰 수 기준
+    chunk_max_tokens: int = Field(default=512, env="CHUNK_MAX_TOKENS")
+    chunk_overlap_tokens: int = Field(default=64, env="CHUNK_OVERLAP_TOKENS")
+    chunk_tokenizer: str = Field(default="BAAI/bge-m3", env="CHUNK_TOKENIZER")  # HF 허브 id 또는 tokenizer.json 경로 (없으면 근사치)
     
     # Embeddings
     embedding_model: str = Field(default="text-embedding-3-small", env="EMBEDDING_MODEL")
+    # 한 번의 Ollama 요청으로 임베딩할 청크 수 (클수록 처리량↑, 요청당 지연↑)
+    embedding_batch_size: int = Field(default=32, env="EMBEDDING_BATCH_SIZE")
+
+    # Embedding worker micro-batching (process_url_for_embedding_smart_batch)
+    # 활성화 시 임베딩 워커는 --prefetch-multiplier를 배치 크기 이상으로 설정해야 함
+    embedding_consumer_batching: bool = Field(default=False, env="EMBEDDING_CONSUMER_BATCHING")
+    embedding_consumer_batch_size: int = Field(default=16, env="EMBEDDING_CONSUMER_BATCH_SIZE")
+    embedding_consumer_flush_interval_ms: int = Field(default=500, env="EMBEDDING_CONSUMER_FLUSH_INTERVAL_MS")
     
     # LLM
     llm_model: str = Field(default="gpt-4-turbo-preview", env="LLM_MODEL")
@@ -58,8 +72,50 @@ class Settings(BaseSettings):
     # RAG
     top_k: int = Field(default=5, env="TOP_K")
 
+    # RAG Cache (in-process LRU + optional shared Redis tier)
+    rag_cache_enabled: bool = Field(default=True, env="RAG_CACHE_ENABLED")
+    rag_cache_ttl_seconds: int = Field(default=600, env="RAG_CACHE_TTL_SECONDS")
+    rag_cache_max_entries: int = Field(default=1024, env="RAG_CACHE_MAX_ENTRIES")
+    rag_cache_redis_enabled: bool = Field(default=True, env="RAG_CACHE_REDIS_ENABLED")
+    rag_cache_redis_max_entries: int = Field(default=20000, env="RAG_CACHE_REDIS_MAX_ENTRIES")  # Redis 캐시 네임스페이스별 최대 항목 수 (초과 시 오래된 항목부터 삭제)
+
+    # Semantic answer cache (paraphrased questions reuse cached answers)
+    semantic_cache_enabled: bool = Field(default=True, env="SEMANTIC_CACHE_ENABLED")
+    semantic_cache_threshold: float = Field(default=0.95, env="SEMANTIC_CACHE_THRESHOLD")
+    semantic_cache_ttl_seconds: int = Field(default=86400, env="SEMANTIC_CACHE_TTL_SECONDS")
+
     # Crawling Configuration
     max_crawl_depth: int = Field(default=2, env="MAX_CRAWL_DEPTH")
+    crawl_concurrency: int = Field(default=4, env="CRAWL_CONCURRENCY")  # 크롤 1개당 동시 Playwright 페이지 수
+    crawl_per_host_concurrency: int = Field(default=2, env="CRAWL_PER_HOST_CONCURRENCY")  # 호스트별 동시 요청 수 (전체 워커 합산)
+    crawl_min_request_interval: float = Field(default=1.0, env="CRAWL_MIN_REQUEST_INTERVAL")  # 같은 호스트 요청 시작 간격 (초, 전체 워커 합산)
+    crawl_host_burst: int = Field(default=3, env="CRAWL_HOST_BURST")  # 토큰 버킷 최대 크기
+    crawl_host_limits: str = Field(default="", env="CRAWL_HOST_LIMITS")  # 호스트별 설정: "host=초당요청:동시요청[:burst],..." (하위 도메인 포함)
+    crawl_backoff_base_seconds: int = Field(default=5, env="CRAWL_BACKOFF_BASE_SECONDS")  # 429/5xx 응답 시 호스트 일시 중지 기본 시간
+    crawl_backoff_max_seconds: int = Field(default=300, env="CRAWL_BACKOFF_MAX_SECONDS")
+    crawl_page_max_retries: int = Field(default=3, env="CRAWL_PAGE_MAX_RETRIES")  # 429/5xx 응답 페이지를 다시 큐에 넣는 최대 횟수
+    crawl_static_min_text_length: int = Field(default=200, env="CRAWL_STATIC_MIN_TEXT_LENGTH")  # 이보다 짧으면 Playwright로 재시도
+    crawl_render_mode_ttl_days: int = Field(default=7, env="CRAWL_RENDER_MODE_TTL_DAYS")
+    crawl_browser_recycle_pages: int = Field(default=500, env="CRAWL_BROWSER_RECYCLE_PAGES")  # 워커별 브라우저 재시작 주기 (페이지 수)
+    crawl_browser_max_memory_mb: int = Field(default=1500, env="CRAWL_BROWSER_MAX_MEMORY_MB")  # 워커 + Chromium RSS 상한
+    crawl_extraction_workers: int = Field(default=2, env="CRAWL_EXTRACTION_WORKERS")  # 크롤러 워커별 HTML 파싱 프로세스 수 (0: 스레드)
+    crawl_manifest_max_links: int = Field(default=300, env="CRAWL_MANIFEST_MAX_LINKS")  # 매니페스트에 저장할 페이지별 링크 수 상한 (넘으면 저장하지 않고 304 대신 전체 요청)
+    crawl_block_resources: bool = Field(default=True, env="CRAWL_BLOCK_RESOURCES")  # 이미지/폰트/CSS/미디어/트래커 차단
+    crawl_checkpoint_enabled: bool = Field(default=True, env="CRAWL_CHECKPOINT_ENABLED")
+    crawl_checkpoint_dir: str = Field(default="/tmp/crawl_checkpoints", env="CRAWL_CHECKPOINT_DIR")
+    crawl_checkpoint_interval_pages: int = Field(default=25, env="CRAWL_CHECKPOINT_INTERVAL_PAGES")
+    crawl_checkpoint_interval_seconds: int = Field(default=30, env="CRAWL_CHECKPOINT_INTERVAL_SECONDS")
+    crawl_checkpoint_ttl_hours: int = Field(default=48, env="CRAWL_CHECKPOINT_TTL_HOURS")  # 재개되지 않은 체크포인트 보관 시간
+    page_store_dir: str = Field(default="/tmp/page_store", env="PAGE_STORE_DIR")  # 크롤러 → 임베딩 워커 페이지 텍스트 (공유 볼륨)
+    page_store_ttl_hours: int = Field(default=48, env="PAGE_STORE_TTL_HOURS")
+    page_store_compression_level: int = Field(default=6, env="PAGE_STORE_COMPRESSION_LEVEL")  # zlib 1-9
+    crawl_distributed_shards: int = Field(default=3, env="CRAWL_DISTRIBUTED_SHARDS")  # 분산 크롤링 시 워커 태스크 수
+    crawl_distributed_lease_size: int = Field(default=8, env="CRAWL_DISTRIBUTED_LEASE_SIZE")
+    crawl_distributed_lease_seconds: int = Field(default=600, env="CRAWL_DISTRIBUTED_LEASE_SECONDS")  # 만료 시 다른 shard가 재처리
+    crawl_distributed_ttl_hours: int = Field(default=24, env="CRAWL_DISTRIBUTED_TTL_HOURS")
+    recrawl_mode: str = Field(default="adaptive", env="RECRAWL_MODE")  # 정기 크롤링: adaptive (변경 빈도 기반) | full
+    recrawl_default_budget: int = Field(default=2000, env="RECRAWL_DEFAULT_BUDGET")  # 폴더별 1회 재방문 페이지 수 (폴더 설정이 없을 때)
+    crawl_discovery_mode: str = Field(default="bfs", env="CRAWL_DISCOVERY_MODE")  # 폴더 크롤링 탐색: bfs | feed (날짜 있는 사이트맵이면 BFS 생략, RSS는 추가 시드)
 
     # CORS Configuration
     cors_origins: str = Field(default="http://localhost:3000", env="CORS_ORIGINS")
@@ -0,0 +1,60 @@
+"""
+Redis client for backend (cache, shared state)
+- get_redis_client / get_async_redis_client: caches, rate limits, locks (allkeys-lru in production)
+- get_state_redis_client: state that must never be evicted (STATE_REDIS_HOST, noeviction)
+"""
+from typing import Optional
+import redis
+import redis.asyncio as redis_asyncio
+
+from config import settings
+
+# Redis 클라이언트 (동기 - Celery 워커용, 비동기 - FastAPI용)
+_redis_client: Optional[redis.Redis] = None
+_async_redis_client: Optional[redis_asyncio.Redis] = None
+_state_redis_client: Optional[redis.Redis] = None
+
+
+def get_redis_client() -> redis.Redis:
+    """Get or create synchronous Redis client (Singleton pattern)"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            socket_timeout=2,
+            socket_connect_timeout=2
+        )
+    return _redis_client
+
+
+def get_async_redis_client() -> redis_asyncio.Redis:
+    """Get or create asyncio Redis client (Singleton pattern)"""
+    global _async_redis_client
+    if _async_redis_client is None:
+        _async_redis_client = redis_asyncio.Redis(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=settings.redis_db,
+            socket_timeout=2,
+            socket_connect_timeout=2
+        )
+    return _async_redis_client
+
+
+def get_state_redis_client() -> redis.Redis:
+    """Get or create the synchronous client for non-evictable state (falls back to REDIS_HOST)"""
+    global _state_redis_client
+    if _state_redis_client is None:
+        if not settings.state_redis_host:
+            _state_redis_client = get_redis_client()
+        else:
+            _state_redis_client = redis.Redis(
+                host=settings.state_redis_host,
+                port=settings.state_redis_port,
+                db=settings.state_redis_db,
+                socket_timeout=2,
+                socket_connect_timeout=2
+            )
+    return _state_redis_client
@@ -0,0 +1,195 @@
+"""
+크롤러 워커 프로세스별 브라우저 풀
+Celery 워커 프로세스마다 이벤트 루프 1개와 Chromium 1개를 유지하고, 크롤마다 새 context만 발급합니다.
+- N 페이지 처리 후 또는 메모리 상한 초과 시 브라우저를 재시작 (사용 중인 context가 없을 때)
+- 브라우저가 죽으면 (disconnected) 다음 요청에서 새로 띄움
+"""
+from typing import Awaitable, Optional, TypeVar
+import asyncio
+import psutil
+import structlog
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright
+
+from config import settings
+
+logger = structlog.get_logger()
+
+BROWSER_ARGS = ['--no-sandbox', '--disable-dev-shm-usage']  # Better Docker compatibility
+
+# 중단된 크롤의 정리(finally: context 반환, 체크포인트 저장)를 기다리는 최대 시간 (초)
+CANCEL_DRAIN_SECONDS = 30
+
+T = TypeVar("T")
+
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_browser_pool: Optional["BrowserPool"] = None
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """Event loop that lives as long as the worker process (the browser is bound to it)"""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    return _worker_loop
+
+
+def run_on_worker_loop(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine to completion on the worker loop
+    If it is interrupted (SoftTimeLimitExceeded raised by the signal handler, KeyboardInterrupt),
+    the task is cancelled and drained before re-raising, so no crawl task stays pending on the
+    long-lived loop holding a browser context, a closed HTTP client or a checkpoint
+    """
+    loop = get_worker_loop()
+    task = loop.create_task(coro)
+    try:
+        return loop.run_until_complete(task)
+    except BaseException:
+        if not task.done():
+            task.cancel()
+            try:
+                loop.run_until_complete(asyncio.wait({task}, timeout=CANCEL_DRAIN_SECONDS))
+            except BaseException as e:
+                logger.warning("Failed to drain cancelled task", error=repr(e))
+            if not task.done():
+                logger.warning("Cancelled task still running after drain timeout")
+            elif not task.cancelled() and task.exception() is not None:
+                logger.debug("Cancelled task ended with an error", error=repr(task.exception()))
+        raise
+
+
+def get_browser_pool() -> "BrowserPool":
+    """Process-wide browser pool (created on first use if worker init did not run)"""
+    global _browser_pool
+    if _browser_pool is None:
+        _browser_pool = BrowserPool(
+            max_pages=settings.crawl_browser_recycle_pages,
+            max_memory_mb=settings.crawl_browser_max_memory_mb
+        )
+    return _browser_pool
+
+
+def process_tree_rss_mb() -> float:
+    """RSS of this process and its children (Playwright driver + Chromium), in MB"""
+    try:
+        process = psutil.Process()
+        rss = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return rss / (1024 * 1024)
+    except psutil.Error:
+        return 0.0
+
+
+class BrowserPool:
+    """One long-lived Chromium per worker process that hands out fresh contexts"""
+
+    def __init__(self, max_pages: int, max_memory_mb: int):
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._active_contexts = 0
+        self._pages_served = 0
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _recycle_reason(self) -> Optional[str]:
+        if self._browser is None:
+            return None
+        if not self._browser.is_connected():
+            return "disconnected"
+        if self._active_contexts:
+            # Never pull the browser out from under a running crawl
+            return None
+        if self.max_pages and self._pages_served >= self.max_pages:
+            return "page_limit"
+        if self.max_memory_mb and process_tree_rss_mb() >= self.max_memory_mb:
+            return "memory_limit"
+        return None
+
+    async def _launch(self) -> None:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+        self._pages_served = 0
+        logger.info("🧭 Browser launched", pid=psutil.Process().pid)
+
+    async def _close_browser(self) -> None:
+        browser, self._browser = self._browser, None
+        if browser is None:
+            return
+        try:
+            await browser.close()
+        except Exception as e:
+            # A crashed browser may already be gone
+            logger.warning("Failed to close browser", error=str(e))
+
+    async def acquire_context(self, **context_options) -> BrowserContext:
+        """New isolated context on the pooled browser (recycling or relaunching it first if needed)"""
+        async with self._get_lock():
+            reason = self._recycle_reason()
+            if reason:
+                logger.info("🧭 Recycling browser", reason=reason, pages_served=self._pages_served)
+                if reason == "disconnected":
+                    # Contexts of a dead browser are unusable anyway
+                    self._active_contexts = 0
+                await self._close_browser()
+
+            if self._browser is None:
+                await self._launch()
+
+            context = await self._browser.new_context(**context_options)
+            self._active_contexts += 1
+            return context
+
+    async def release_context(self, context: BrowserContext) -> None:
+        """Close a context handed out by acquire_context"""
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning("Failed to close browser context", error=str(e))
+        finally:
+            self._active_contexts = max(0, self._active_contexts - 1)
+
+    def is_usable(self, context: BrowserContext) -> bool:
+        """False once the browser behind the context has crashed"""
+        return context.browser is not None and context.browser.is_connected()
+
+    def record_page(self) -> None:
+        self._pages_served += 1
+
+    async def close(self) -> None:
+        await self._close_browser()
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                logger.warning("Failed to stop Playwright", error=str(e))
+            self._playwright = None
+
+
+def init_worker_browser_pool() -> None:
+    """Create the per-process loop and pool (the browser itself starts on first use)"""
+    get_worker_loop()
+    get_browser_pool()
+
+
+def shutdown_worker_browser_pool() -> None:
+    global _browser_pool
+    if _browser_pool is None or _worker_loop is None or _worker_loop.is_closed():
+        return
+
+    try:
+        _worker_loop.run_until_complete(_browser_pool.close())
+    except Exception as e:
+        logger.warning("Failed to shut down browser pool", error=str(e))
+    _browser_pool = None
@@ -0,0 +1,179 @@
+"""
+RAG 검색 캐시
+1차: 프로세스 내 LRU + TTL, 2차: Redis (여러 API 프로세스가 공유)
+
+검색 결과 키에는 컬렉션 버전이 포함됩니다. 임베딩 작업이 Qdrant에 upsert할 때마다
+bump_collection_version()으로 버전을 올리면 이전 검색 결과는 더 이상 조회되지 않습니다.
+Redis 항목은 네임스페이스별 인덱스(ZSET)로 개수를 제한하므로 (RAG_CACHE_REDIS_MAX_ENTRIES),
+캐시가 같은 Redis의 다른 키를 밀어내지 않습니다.
+"""
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+import hashlib
+import json
+import re
+import time
+import unicodedata
+import structlog
+
+from config import settings
+from redis_client import get_redis_client, get_async_redis_client
+
+logger = structlog.get_logger()
+
+CACHE_KEY_PREFIX = "rag:cache"
+
+# 버전을 매 요청마다 Redis에서 읽지 않도록 잠시 로컬에 보관 (초)
+VERSION_REFRESH_INTERVAL = 2.0
+
+# KEYS: entry key, namespace index | ARGV: value, ttl seconds, now, max entries
+# Stores the entry and drops the namespace's expired and oldest entries beyond max entries
+CACHE_SET_SCRIPT = """
+local ttl = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ttl)
+redis.call('ZADD', KEYS[2], now, KEYS[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - ttl)
+local overflow = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[4])
+if overflow > 0 then
+    local evicted = redis.call('ZRANGE', KEYS[2], 0, overflow - 1)
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, overflow - 1)
+    redis.call('DEL', unpack(evicted))
+end
+redis.call('EXPIRE', KEYS[2], ttl)
+return overflow
+"""
+
+
+def collection_version_key() -> str:
+    """Redis key holding the collection version counter"""
+    return f"rag:collection_version:{settings.qdrant_collection_name}"
+
+
+def bump_collection_version() -> None:
+    """Increment the collection version (called by embedding tasks after upsert)"""
+    try:
+        get_redis_client().incr(collection_version_key())
+    except Exception as e:
+        logger.warning("Failed to bump collection version", error=str(e))
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text for cache keys (NFKC, lowercase, collapsed whitespace)"""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Build a compact cache key from arbitrary JSON-serializable parts"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def department_key(departments: Iterable[str], urls: Iterable[str]) -> list:
+    """Order-independent representation of a user's department set"""
+    return [sorted(set(departments)), sorted(set(urls))]
+
+
+class TTLCache:
+    """Small in-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+
+class RetrievalCache:
+    """Two-tier (local LRU → Redis) cache for query embeddings and retrieval results"""
+
+    def __init__(self):
+        self.enabled = settings.rag_cache_enabled
+        self.redis_enabled = settings.rag_cache_redis_enabled
+        self.ttl_seconds = settings.rag_cache_ttl_seconds
+        self._local = TTLCache(settings.rag_cache_max_entries, settings.rag_cache_ttl_seconds)
+        self.redis_max_entries = settings.rag_cache_redis_max_entries
+        self._version = 0
+        self._version_checked_at = 0.0
+        self._set_script = None
+
+    async def collection_version(self) -> int:
+        """Current collection version (0 when Redis is unavailable)"""
+        if not self.redis_enabled:
+            return 0
+
+        now = time.monotonic()
+        if now - self._version_checked_at < VERSION_REFRESH_INTERVAL:
+            return self._version
+
+        try:
+            value = await get_async_redis_client().get(collection_version_key())
+            self._version = int(value) if value else 0
+        except Exception as e:
+            logger.warning("Failed to read collection version", error=str(e))
+        self._version_checked_at = now
+        return self._version
+
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+
+        full_key = f"{CACHE_KEY_PREFIX}:{namespace}:{key}"
+        value = self._local.get(full_key)
+        if value is not None:
+            return value
+
+        if not self.redis_enabled:
+            return None
+
+        try:
+            raw = await get_async_redis_client().get(full_key)
+        except Exception as e:
+            logger.warning("Redis cache read failed", namespace=namespace, error=str(e))
+            return None
+
+        if raw is None:
+            return None
+
+        value = json.loads(raw)
+        self._local.set(full_key, value)
+        return value
+
+    async def set(self, namespace: str, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+
+        full_key = f"{CACHE_KEY_PREFIX}:{namespace}:{key}"
+        self._local.set(full_key, value)
+
+        if not self.redis_enabled:
+            return
+
+        try:
+            if self._set_script is None:
+                self._set_script = get_async_redis_client().register_script(CACHE_SET_SCRIPT)
+            await self._set_script(
+                keys=[full_key, f"{CACHE_KEY_PREFIX}:{namespace}:index"],
+                args=[json.dumps(value, ensure_ascii=False), self.ttl_seconds, time.time(), self.redis_max_entries]
+            )
+        except Exception as e:
+            logger.warning("Redis cache write failed", namespace=namespace, error=str(e))
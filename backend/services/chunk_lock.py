@@ -0,0 +1,102 @@
+"""
+청크 포인트 잠금 (Redis)
+여러 URL이 공유하는 청크 포인트의 urls/url 페이로드는 읽고-고치고-쓰는 방식으로 갱신되므로,
+여러 임베딩 워커가 같은 청크를 동시에 고치면 서로의 URL 추가/삭제를 덮어쓸 수 있습니다.
+store_pages는 페이로드를 읽기 전에 건드릴 모든 포인트를 한 번에(전부 아니면 없음) 잠급니다.
+- 한 번의 스크립트 호출로 모든 키를 잡으므로 워커끼리 교착 상태가 생기지 않습니다
+- 잠금에는 만료 시간이 있어 워커가 죽어도 풀립니다
+"""
+from contextlib import contextmanager
+from typing import Iterable
+import random
+import time
+import uuid
+import structlog
+
+from config import settings
+from redis_client import get_redis_client
+
+logger = structlog.get_logger()
+
+# 잠금 만료 (Qdrant retrieve + upsert + batch_update보다 충분히 길게)
+CHUNK_LOCK_LEASE_MS = 60000
+# 잠금을 기다리는 최대 시간 (초과하면 ChunkLockTimeout, 태스크가 재시도됨)
+CHUNK_LOCK_WAIT_SECONDS = 120
+CHUNK_LOCK_POLL_SECONDS = 0.05
+
+# KEYS: lock keys | ARGV: token, lease ms
+# 1 when every key was free and is now held, 0 otherwise (nothing is taken)
+ACQUIRE_ALL_SCRIPT = """
+for i = 1, #KEYS do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        return 0
+    end
+end
+for i = 1, #KEYS do
+    redis.call('SET', KEYS[i], ARGV[1], 'PX', ARGV[2])
+end
+return 1
+"""
+
+# KEYS: lock keys | ARGV: token -- only keys still held by this token are removed
+RELEASE_ALL_SCRIPT = """
+local released = 0
+for i = 1, #KEYS do
+    if redis.call('GET', KEYS[i]) == ARGV[1] then
+        redis.call('DEL', KEYS[i])
+        released = released + 1
+    end
+end
+return released
+"""
+
+
+class ChunkLockTimeout(Exception):
+    """Another worker held some of the chunk points for longer than CHUNK_LOCK_WAIT_SECONDS"""
+
+
+def chunk_lock_key(point_id: str) -> str:
+    return f"rag:chunk_lock:{settings.qdrant_collection_name}:{point_id}"
+
+
+class ChunkLocks:
+    def __init__(self):
+        self._acquire = None
+        self._release = None
+
+    def _scripts(self):
+        if self._acquire is None:
+            redis = get_redis_client()
+            self._acquire = redis.register_script(ACQUIRE_ALL_SCRIPT)
+            self._release = redis.register_script(RELEASE_ALL_SCRIPT)
+        return self._acquire, self._release
+
+    @contextmanager
+    def hold(self, point_ids: Iterable[str]):
+        """Hold every point's lock for the duration of the block"""
+        keys = [chunk_lock_key(point_id) for point_id in sorted(set(point_ids))]
+        if not keys:
+            yield
+            return
+
+        # Redis errors propagate: the embedding task is retried rather than racing other workers
+        token = uuid.uuid4().hex
+        acquire, release = self._scripts()
+        deadline = time.monotonic() + CHUNK_LOCK_WAIT_SECONDS
+        while not acquire(keys=keys, args=[token, CHUNK_LOCK_LEASE_MS]):
+            if time.monotonic() > deadline:
+                raise ChunkLockTimeout(f"{len(keys)} chunk points still locked")
+            # Jitter so waiting workers do not retry in lockstep
+            time.sleep(CHUNK_LOCK_POLL_SECONDS + random.uniform(0, CHUNK_LOCK_POLL_SECONDS))
+
+        try:
+            yield
+        finally:
+            try:
+                release(keys=keys, args=[token])
+            except Exception as e:
+                logger.warning("Failed to release chunk locks", points=len(keys), error=str(e))
+
+
+# 전역 인스턴스
+chunk_locks = ChunkLocks()
@@ -0,0 +1,242 @@
+"""
+임베딩 모델 토큰 기준 청크 분할 (한국어 게시판 페이지용)
+- 길이는 bge-m3 토크나이저 토큰 수로 측정합니다 (tokenizers를 쓸 수 없으면 한글/영문 비율 기반 근사치)
+- 추출된 텍스트의 줄 구조를 유지합니다: 제목과 작성자/등록일/조회수/첨부파일 같은 메타데이터 줄,
+  게시판 목록의 한 행(번호, 제목, 날짜, 조회수)은 같은 블록으로 묶어 청크 경계에서 떨어지지 않게 합니다
+- 한 블록이 너무 길면 문장 끝(다. 요. 까? 등)에서, 그래도 길면 토큰 수 기준으로 자릅니다
+- split_texts는 여러 문서의 모든 줄을 한 번의 encode_batch로 세므로 배치 임베딩 워커에서 분할 비용이 작습니다
+"""
+from typing import List, Optional, Tuple
+import math
+import os
+import re
+import structlog
+
+from config import settings
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:  # 근사 토큰 수로 동작
+    Tokenizer = None
+
+logger = structlog.get_logger()
+
+# 게시글 메타데이터 줄과 목록의 날짜 칸: 앞 줄(제목)과 같은 블록
+METADATA_LINE_RE = re.compile(
+    r"^(?:작성자|글쓴이|작성일|등록일|게시일|수정일|조회수?|첨부(?:파일)?|담당(?:부서|자)?|연락처|분류|구분)\s*[:：]?"
+)
+DATE_LINE_RE = re.compile(r"^(?:\d{2,4}[.\-/]\d{1,2}[.\-/]\d{1,2}\.?|\d{1,2}:\d{2})$")
+# 목록의 번호/공지 표시 칸: 날짜 뒤면 조회수(앞 블록), 아니면 다음 줄(제목)과 같은 블록
+ROW_MARKER_RE = re.compile(r"^(?:\d+|N|new|공지)$", re.IGNORECASE)
+
+# 문장 끝: 마침표/물음표/느낌표 (한국어 종결어미 "다." "요." "까?" 포함) 뒤의 공백
+SENTENCE_END_RE = re.compile(r"(?<=[.!?。？！])\s+")
+
+# 근사 토큰 수 (bge-m3/XLM-R sentencepiece 기준, 약간 크게 잡음)
+HANGUL_CHARS_PER_TOKEN = 1.5
+LATIN_CHARS_PER_TOKEN = 4.0
+DIGITS_PER_TOKEN = 3.0
+APPROX_TOKEN_RE = re.compile(r"([가-힣ㄱ-ㅎㅏ-ㅣ]+)|([A-Za-z]+)|(\d+)|\S")
+
+_tokenizer = None
+_tokenizer_loaded = False
+
+
+def get_tokenizer():
+    """The embedding model's tokenizer (CHUNK_TOKENIZER: hub id or tokenizer.json), None if unavailable"""
+    global _tokenizer, _tokenizer_loaded
+    if _tokenizer_loaded:
+        return _tokenizer
+    _tokenizer_loaded = True
+
+    if Tokenizer is None or not settings.chunk_tokenizer:
+        logger.info("tokenizers not available, chunking with approximate token counts")
+        return None
+
+    try:
+        if os.path.exists(settings.chunk_tokenizer):
+            _tokenizer = Tokenizer.from_file(settings.chunk_tokenizer)
+        else:
+            _tokenizer = Tokenizer.from_pretrained(settings.chunk_tokenizer)
+        _tokenizer.no_truncation()
+        _tokenizer.no_padding()
+    except Exception as e:
+        logger.warning("Failed to load tokenizer, chunking with approximate token counts",
+                       tokenizer=settings.chunk_tokenizer, error=str(e))
+        _tokenizer = None
+    return _tokenizer
+
+
+def approximate_tokens(text: str) -> int:
+    tokens = 0.0
+    for hangul, latin, digits in APPROX_TOKEN_RE.findall(text):
+        if hangul:
+            tokens += math.ceil(len(hangul) / HANGUL_CHARS_PER_TOKEN)
+        elif latin:
+            tokens += math.ceil(len(latin) / LATIN_CHARS_PER_TOKEN)
+        elif digits:
+            tokens += math.ceil(len(digits) / DIGITS_PER_TOKEN)
+        else:
+            tokens += 1
+    return int(tokens)
+
+
+def count_tokens_batch(texts: List[str]) -> List[int]:
+    """Token counts for many strings (one encode_batch call with the real tokenizer)"""
+    if not texts:
+        return []
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return [approximate_tokens(text) for text in texts]
+    return [len(encoding.ids) for encoding in tokenizer.encode_batch(texts, add_special_tokens=False)]
+
+
+def count_tokens(text: str) -> int:
+    return count_tokens_batch([text])[0]
+
+
+def _blocks(text: str) -> List[List[str]]:
+    """
+    Lines grouped by board-post structure: a title keeps its metadata lines, and a list row
+    (number, title, date, views) stays in one block
+    """
+    blocks: List[List[str]] = []
+    open_block = False  # the last block is only a row number, waiting for its title
+    previous = ""
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+
+        if blocks and (METADATA_LINE_RE.match(line) or DATE_LINE_RE.match(line)):
+            blocks[-1].append(line)
+        elif ROW_MARKER_RE.match(line):
+            if blocks and DATE_LINE_RE.match(previous):
+                blocks[-1].append(line)
+            elif open_block:
+                blocks[-1].append(line)
+            else:
+                blocks.append([line])
+                open_block = True
+            previous = line
+            continue
+        elif open_block:
+            blocks[-1].append(line)
+        else:
+            blocks.append([line])
+
+        open_block = False
+        previous = line
+    return blocks
+
+
+class TokenChunker:
+    """Packs line blocks into chunks of at most max_tokens with about overlap_tokens of overlap"""
+
+    def __init__(self, max_tokens: int, overlap_tokens: int):
+        self.max_tokens = max(16, max_tokens)
+        self.overlap_tokens = max(0, min(overlap_tokens, self.max_tokens // 2))
+
+    def _units(self, blocks: List[List[str]], counts: List[int]) -> List[Tuple[str, int]]:
+        """(text, tokens) units no longer than max_tokens, in document order"""
+        units = []
+        for lines, tokens in zip(blocks, counts):
+            block = "\n".join(lines)
+            if tokens <= self.max_tokens:
+                units.append((block, tokens))
+                continue
+            for line in lines:
+                units.extend(self._split_long(line))
+        return units
+
+    def _split_long(self, text: str) -> List[Tuple[str, int]]:
+        """A line over the limit: pack its sentences, hard-split sentences still over the limit"""
+        sentences = [s for s in SENTENCE_END_RE.split(text) if s]
+        counts = count_tokens_batch(sentences)
+
+        pieces = []
+        for sentence, tokens in zip(sentences, counts):
+            if tokens <= self.max_tokens:
+                pieces.append((sentence, tokens))
+            else:
+                pieces.extend(self._hard_split(sentence, tokens))
+
+        # Sentences of one line are joined back with spaces
+        packed = []
+        current, current_tokens = [], 0
+        for sentence, tokens in pieces:
+            if current and current_tokens + tokens > self.max_tokens:
+                packed.append((" ".join(current), current_tokens))
+                current, current_tokens = [], 0
+            current.append(sentence)
+            current_tokens += tokens
+        if current:
+            packed.append((" ".join(current), current_tokens))
+        return packed
+
+    def _hard_split(self, text: str, tokens: int) -> List[Tuple[str, int]]:
+        """No sentence boundary: cut into windows of about max_tokens"""
+        tokenizer = get_tokenizer()
+        if tokenizer is not None:
+            offsets = tokenizer.encode(text, add_special_tokens=False).offsets
+            pieces = []
+            for start in range(0, len(offsets), self.max_tokens):
+                window = offsets[start:start + self.max_tokens]
+                piece = text[window[0][0]:window[-1][1]].strip()
+                if piece:
+                    pieces.append((piece, len(window)))
+            return pieces
+
+        chars_per_window = max(1, int(len(text) * self.max_tokens / max(tokens, 1) * 0.9))
+        pieces = []
+        for start in range(0, len(text), chars_per_window):
+            piece = text[start:start + chars_per_window].strip()
+            if piece:
+                pieces.append((piece, approximate_tokens(piece)))
+        return pieces
+
+    def _pack(self, units: List[Tuple[str, int]]) -> List[str]:
+        chunks = []
+        current: List[Tuple[str, int]] = []
+        current_tokens = 0
+        for text, tokens in units:
+            if current and current_tokens + tokens > self.max_tokens:
+                chunks.append("\n".join(unit for unit, _ in current))
+                # Carry the trailing units that fit in the overlap into the next chunk
+                overlap, overlap_tokens = [], 0
+                for unit in reversed(current):
+                    if overlap_tokens + unit[1] > self.overlap_tokens or overlap_tokens + unit[1] + tokens > self.max_tokens:
+                        break
+                    overlap.insert(0, unit)
+                    overlap_tokens += unit[1]
+                current, current_tokens = overlap, overlap_tokens
+            current.append((text, tokens))
+            current_tokens += tokens
+        if current:
+            chunks.append("\n".join(unit for unit, _ in current))
+        return chunks
+
+    def split_texts(self, texts: List[str]) -> List[List[str]]:
+        """Chunks for each text; every block of every text is counted in one batch"""
+        all_blocks = [_blocks(text) for text in texts]
+        flat = ["\n".join(lines) for blocks in all_blocks for lines in blocks]
+        counts = iter(count_tokens_batch(flat))
+
+        results = []
+        for blocks in all_blocks:
+            block_counts = [next(counts) for _ in blocks]
+            results.append(self._pack(self._units(blocks, block_counts)))
+        return results
+
+    def split_text(self, text: str) -> List[str]:
+        return self.split_texts([text])[0]
+
+
+_chunker: Optional[TokenChunker] = None
+
+
+def get_chunker() -> TokenChunker:
+    global _chunker
+    if _chunker is None:
+        _chunker = TokenChunker(settings.chunk_max_tokens, settings.chunk_overlap_tokens)
+    return _chunker
@@ -0,0 +1,183 @@
+"""
+재시작 가능한 크롤링 체크포인트 (SQLite)
+크롤 id(task_id)마다 SQLite 파일 하나에 프론티어 큐, 방문(seen) 집합, 처리 상태를 저장합니다.
+- 큐와 seen 집합이 디스크에 있으므로 매우 큰 사이트도 메모리 사용량이 일정합니다
+- N 페이지 또는 T초마다 commit → 재시도된 crawl_website는 마지막 체크포인트부터 이어서 크롤링
+- 체크포인트 시점에 처리 중이던 URL은 재개 시 다시 큐에 들어갑니다
+"""
+from pathlib import Path
+from typing import Optional, Tuple
+import os
+import re
+import sqlite3
+import time
+import structlog
+
+from config import settings
+from services.url_frontier import canonicalize_url
+
+logger = structlog.get_logger()
+
+STATE_QUEUED = 0
+STATE_IN_PROGRESS = 1
+STATE_DONE = 2
+
+# url: canonical dedup key, fetch_url: the URL as first discovered (fetched and stored)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    depth INTEGER NOT NULL,
+    state INTEGER NOT NULL DEFAULT 0,
+    fetch_url TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_frontier_state ON frontier(state, id);
+"""
+
+
+def checkpoint_path(crawl_id: str) -> Path:
+    safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", crawl_id)
+    return Path(settings.crawl_checkpoint_dir) / f"{safe_id}.sqlite"
+
+
+def purge_stale_checkpoints() -> None:
+    """Remove checkpoints of crawls that were never resumed"""
+    directory = Path(settings.crawl_checkpoint_dir)
+    if not directory.exists():
+        return
+
+    cutoff = time.time() - settings.crawl_checkpoint_ttl_hours * 3600
+    for path in directory.glob("*.sqlite*"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                logger.info("Removed stale crawl checkpoint", path=str(path))
+        except OSError:
+            continue
+
+
+class CheckpointedFrontier:
+    """
+    Disk-backed drop-in for UrlFrontier (add / pop / in / len / seen_count)
+    Every URL ever queued is one row; its state tracks queued → in progress → done
+    """
+
+    def __init__(self, crawl_id: str):
+        self.crawl_id = crawl_id
+        self.path = checkpoint_path(crawl_id)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(str(self.path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(frontier)")}
+        if "fetch_url" not in columns:
+            # Checkpoint written before fetch_url existed: its rows fall back to the canonical URL
+            self._conn.execute("ALTER TABLE frontier ADD COLUMN fetch_url TEXT")
+
+        # Pages that were being crawled when the last checkpoint was taken start over
+        self._conn.execute("UPDATE frontier SET state = ? WHERE state = ?", (STATE_QUEUED, STATE_IN_PROGRESS))
+        self._conn.commit()
+
+        self._seen = self._count()
+        self._queued = self._count(STATE_QUEUED)
+        self.resumed = self._seen > 0
+        self._pages_since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+        if self.resumed:
+            logger.info(
+                "Resuming crawl from checkpoint",
+                crawl_id=crawl_id,
+                seen=self._seen,
+                queued=self._queued,
+                done=self._count(STATE_DONE)
+            )
+
+    def _count(self, state: Optional[int] = None) -> int:
+        if state is None:
+            return self._conn.execute("SELECT COUNT(*) FROM frontier").fetchone()[0]
+        return self._conn.execute("SELECT COUNT(*) FROM frontier WHERE state = ?", (state,)).fetchone()[0]
+
+    def add(self, url: str, depth: int) -> bool:
+        """Queue a URL unless it was already queued or visited; returns True if added"""
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO frontier (url, depth, state, fetch_url) VALUES (?, ?, ?, ?)",
+            (canonicalize_url(url), depth, STATE_QUEUED, url.strip())
+        )
+        if cursor.rowcount:
+            self._seen += 1
+            self._queued += 1
+            return True
+        return False
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Next (url, depth) in BFS order, or None when empty"""
+        row = self._conn.execute(
+            "SELECT id, COALESCE(fetch_url, url), depth FROM frontier WHERE state = ? ORDER BY id LIMIT 1",
+            (STATE_QUEUED,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        self._conn.execute("UPDATE frontier SET state = ? WHERE id = ?", (STATE_IN_PROGRESS, row[0]))
+        self._queued -= 1
+        return row[1], row[2]
+
+    def requeue(self, url: str, depth: int) -> None:
+        """Put a popped URL back at the end of the queue (a new id keeps BFS order)"""
+        self._conn.execute(
+            "UPDATE frontier SET id = (SELECT MAX(id) + 1 FROM frontier), state = ? WHERE url = ?",
+            (STATE_QUEUED, canonicalize_url(url))
+        )
+        self._queued += 1
+
+    def mark_done(self, url: str) -> None:
+        """Record a processed URL and checkpoint every CRAWL_CHECKPOINT_INTERVAL_PAGES pages / seconds"""
+        self._conn.execute("UPDATE frontier SET state = ? WHERE url = ?", (STATE_DONE, canonicalize_url(url)))
+        self._pages_since_checkpoint += 1
+
+        if (
+            self._pages_since_checkpoint >= settings.crawl_checkpoint_interval_pages
+            or time.monotonic() - self._last_checkpoint >= settings.crawl_checkpoint_interval_seconds
+        ):
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        self._conn.commit()
+        self._pages_since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+    @property
+    def done_count(self) -> int:
+        """Pages finished so far, including earlier attempts of this crawl"""
+        return self._count(STATE_DONE)
+
+    def close(self) -> None:
+        """Checkpoint and keep the file so a retry can resume"""
+        try:
+            self.checkpoint()
+        finally:
+            self._conn.close()
+
+    def discard(self) -> None:
+        """The crawl finished: drop the checkpoint"""
+        self._conn.close()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(f"{self.path}{suffix}")
+            except FileNotFoundError:
+                pass
+
+    def __contains__(self, url: str) -> bool:
+        return self._conn.execute(
+            "SELECT 1 FROM frontier WHERE url = ?", (canonicalize_url(url),)
+        ).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._queued
+
+    @property
+    def seen_count(self) -> int:
+        return self._seen
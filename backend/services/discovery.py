@@ -0,0 +1,251 @@
+"""
+사이트맵/RSS 기반 증분 탐색
+robots.txt의 Sitemap, /sitemap.xml(사이트맵 인덱스 포함), 루트 페이지에 선언된 RSS/Atom 피드를 읽어
+lastmod가 URL 매니페스트의 last_crawled보다 새로운 URL만 골라냅니다.
+- lastmod가 있는 사이트맵만 사이트 전체를 대표하므로 BFS를 대신할 수 있습니다
+- RSS/Atom 피드는 최근 글 몇 개만 담으므로 BFS에 더해지는 추가 시드로만 쓰입니다
+"""
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+import xml.etree.ElementTree as ET
+import asyncio
+import httpx
+import pytz
+import structlog
+from bs4 import BeautifulSoup
+
+from services.rate_limit import host_rate_limiter
+from services.url_frontier import canonicalize_url
+from services.url_manifest import url_manifest
+
+logger = structlog.get_logger()
+
+KST = pytz.timezone('Asia/Seoul')
+
+DISCOVERY_BFS = "bfs"
+DISCOVERY_FEED = "feed"
+
+DEFAULT_SITEMAP_PATHS = ("/sitemap.xml", "/sitemap_index.xml")
+FEED_TYPES = ("application/rss+xml", "application/atom+xml")
+
+# 사이트맵 인덱스가 매우 큰 사이트 보호용
+MAX_SITEMAPS = 50
+MAX_FEED_ENTRIES = 50000
+
+FeedEntry = Tuple[str, Optional[datetime]]
+
+
+class DiscoveryResult(NamedTuple):
+    changed_urls: List[str]
+    # True when a dated sitemap covers the site and the BFS crawl can be skipped
+    replaces_bfs: bool
+
+
+def _local_name(tag: str) -> str:
+    """Tag name without its XML namespace"""
+    return tag.rsplit("}", 1)[-1].lower()
+
+
+def _child_text(element: ET.Element, name: str) -> Optional[str]:
+    for child in element:
+        if _local_name(child.tag) == name and child.text:
+            return child.text.strip()
+    return None
+
+
+def parse_feed_date(value: Optional[str]) -> Optional[datetime]:
+    """W3C datetime (sitemap/Atom) or RFC 822 (RSS) → aware datetime"""
+    if not value:
+        return None
+
+    parsed = None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+
+    if parsed.tzinfo is None:
+        parsed = KST.localize(parsed)
+    return parsed
+
+
+def parse_sitemap(xml_text: str) -> Tuple[List[FeedEntry], List[str]]:
+    """Returns (page entries, child sitemap URLs) for a urlset or sitemapindex document"""
+    root = ET.fromstring(xml_text)
+    entries, children = [], []
+
+    for element in root:
+        name = _local_name(element.tag)
+        loc = _child_text(element, "loc")
+        if not loc:
+            continue
+        if name == "url":
+            entries.append((loc, parse_feed_date(_child_text(element, "lastmod"))))
+        elif name == "sitemap":
+            children.append(loc)
+
+    return entries, children
+
+
+def parse_feed(xml_text: str) -> List[FeedEntry]:
+    """RSS 2.0 items or Atom entries → (link, published/updated)"""
+    root = ET.fromstring(xml_text)
+    entries = []
+
+    for element in root.iter():
+        name = _local_name(element.tag)
+        if name == "item":
+            link = _child_text(element, "link")
+            if link:
+                entries.append((link, parse_feed_date(_child_text(element, "pubdate"))))
+        elif name == "entry":
+            link = None
+            for child in element:
+                if _local_name(child.tag) == "link" and child.get("rel", "alternate") == "alternate":
+                    link = child.get("href")
+                    break
+            if link:
+                updated = _child_text(element, "updated") or _child_text(element, "published")
+                entries.append((link, parse_feed_date(updated)))
+
+    return entries
+
+
+async def _get_text(client: httpx.AsyncClient, url: str) -> Optional[str]:
+    try:
+        async with host_rate_limiter.slot(urlsplit(url).netloc):
+            response = await client.get(url)
+    except Exception as e:
+        logger.info("Discovery fetch failed", url=url, error=str(e))
+        return None
+    if response.status_code >= 400:
+        return None
+    return response.text
+
+
+async def _sitemap_locations(client: httpx.AsyncClient, root_url: str) -> List[str]:
+    """Sitemaps declared in robots.txt, else the conventional paths"""
+    origin = "{0.scheme}://{0.netloc}".format(urlsplit(root_url))
+    robots = await _get_text(client, origin + "/robots.txt")
+
+    declared = []
+    for line in (robots or "").splitlines():
+        if line.lower().startswith("sitemap:"):
+            declared.append(line.split(":", 1)[1].strip())
+
+    return declared or [origin + path for path in DEFAULT_SITEMAP_PATHS]
+
+
+async def _read_sitemaps(client: httpx.AsyncClient, root_url: str) -> List[FeedEntry]:
+    pending = await _sitemap_locations(client, root_url)
+    seen = set()
+    entries = []
+
+    while pending and len(seen) < MAX_SITEMAPS and len(entries) < MAX_FEED_ENTRIES:
+        sitemap_url = pending.pop(0)
+        if sitemap_url in seen:
+            continue
+        seen.add(sitemap_url)
+
+        xml_text = await _get_text(client, sitemap_url)
+        if not xml_text or "<" not in xml_text:
+            continue
+        try:
+            page_entries, children = parse_sitemap(xml_text)
+        except ET.ParseError:
+            logger.info("Invalid sitemap", url=sitemap_url)
+            continue
+
+        entries.extend(page_entries)
+        pending.extend(children)
+
+    return entries
+
+
+async def _read_feeds(client: httpx.AsyncClient, root_url: str) -> List[FeedEntry]:
+    """RSS/Atom feeds advertised by <link rel="alternate"> on the root page"""
+    html = await _get_text(client, root_url)
+    if not html:
+        return []
+
+    soup = BeautifulSoup(html, "html.parser")
+    entries = []
+    for link in soup.find_all("link", href=True):
+        if (link.get("type") or "").lower() not in FEED_TYPES:
+            continue
+
+        feed_url = urljoin(root_url, link["href"])
+        xml_text = await _get_text(client, feed_url)
+        if not xml_text:
+            continue
+        try:
+            entries.extend(parse_feed(xml_text))
+        except ET.ParseError:
+            logger.info("Invalid feed", url=feed_url)
+
+    return entries
+
+
+def url_in_scope(url: str, root_url: str) -> bool:
+    """Same host, under the root URL's directory"""
+    root = urlsplit(root_url)
+    target = urlsplit(url)
+    scope = root.path.rsplit("/", 1)[0] + "/"
+    return target.netloc == root.netloc and target.path.startswith(scope)
+
+
+def select_changed_urls(entries: Iterable[FeedEntry], root_url: str) -> Optional[List[str]]:
+    """
+    URLs whose lastmod is newer than our last crawl (or never crawled)
+    None when the feeds carry no lastmod at all - they cannot drive an incremental crawl
+    """
+    # Deduplicated on the canonical form; the first listed URL is what gets fetched and stored
+    latest: Dict[str, Optional[datetime]] = {}
+    first_url: Dict[str, str] = {}
+    for url, lastmod in entries:
+        if not url_in_scope(url, root_url):
+            continue
+        url = first_url.setdefault(canonicalize_url(url), url.strip())
+        previous = latest.get(url)
+        latest[url] = lastmod if previous is None or (lastmod and lastmod > previous) else previous
+
+    if not latest or not any(latest.values()):
+        return None
+
+    manifest = url_manifest.get_many(latest.keys())
+    changed = []
+    for url, lastmod in latest.items():
+        entry = manifest.get(url)
+        last_crawled = parse_feed_date(entry.get("last_crawled")) if entry else None
+        if last_crawled is None:
+            changed.append(url)
+        elif lastmod is not None and lastmod > last_crawled:
+            changed.append(url)
+
+    return changed
+
+
+async def discover_changed_urls(client: httpx.AsyncClient, root_url: str) -> DiscoveryResult:
+    """Changed URLs from sitemaps and RSS/Atom feeds; only a dated sitemap replaces BFS"""
+    sitemap_entries = await _read_sitemaps(client, root_url)
+    feed_entries = await _read_feeds(client, root_url)
+
+    # Manifest lookups are blocking Redis calls: run the selection off the event loop
+    sitemap_changed = await asyncio.to_thread(select_changed_urls, sitemap_entries, root_url)
+    feed_changed = await asyncio.to_thread(select_changed_urls, feed_entries, root_url) or []
+    changed = list(dict.fromkeys((sitemap_changed or []) + feed_changed))
+
+    logger.info(
+        "Feed discovery",
+        root_url=root_url,
+        sitemap_entries=len(sitemap_entries),
+        feed_entries=len(feed_entries),
+        changed=len(changed),
+        replaces_bfs=sitemap_changed is not None
+    )
+    return DiscoveryResult(changed, sitemap_changed is not None)
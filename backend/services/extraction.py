@@ -0,0 +1,208 @@
+"""
+HTML 본문/링크 추출
+한 번의 파싱으로 본문 텍스트(script/style/nav/footer/header 제거, 본문 영역 우선)와 아웃링크를 함께 얻습니다.
+lxml로 파싱하고, lxml이 거부하는 문서는 기존 BeautifulSoup(html.parser) 경로로 처리합니다.
+크롤러는 파싱을 프로세스 풀에서 실행하여 이벤트 루프가 네트워크 I/O를 계속 처리하도록 합니다.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional
+from urllib.parse import urljoin
+import asyncio
+import multiprocessing
+import re
+import structlog
+from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
+
+from config import settings
+
+logger = structlog.get_logger()
+
+REMOVED_TAGS = ("script", "style", "nav", "footer", "header")
+
+# 본문 영역 후보 (앞쪽이 우선): main, article, div[role="main"], .content, #content
+# lxml 경로는 제거 대상 태그를 지우지 않고 건너뛰므로, 그 안(또는 그 자신)에 있는 후보는 제외합니다
+MAIN_CONTENT_SELECTORS = ("main", "article", 'div[role="main"]', ".content", "#content")
+NOT_REMOVED = "not({})".format(" or ".join(f"ancestor-or-self::{tag}" for tag in REMOVED_TAGS))
+MAIN_CONTENT_XPATHS = tuple(
+    etree.XPath(xpath.format(NOT_REMOVED))
+    for xpath in (
+        "(//main[{}])[1]",
+        "(//article[{}])[1]",
+        '(//div[@role="main"][{}])[1]',
+        '(//*[contains(concat(" ", normalize-space(@class), " "), " content ")][{}])[1]',
+        '(//*[@id="content"][{}])[1]',
+    )
+)
+
+# Links to binary files are not followed
+SKIPPED_EXTENSIONS_RE = re.compile(r'\.(pdf|jpg|jpeg|png|gif|zip|doc|docx|xls|xlsx|ppt|pptx)$', re.IGNORECASE)
+
+
+class ExtractedPage(NamedTuple):
+    text: str
+    links: List[str]
+
+
+def clean_text(strings) -> str:
+    """One line per non-empty text fragment"""
+    lines = []
+    for string in strings:
+        for line in string.split("\n"):
+            line = line.strip()
+            if line:
+                lines.append(line)
+    return "\n".join(lines)
+
+
+def filter_link(href: Optional[str], base_url: str) -> Optional[str]:
+    """Absolute link target, or None for fragments, javascript: and binary files"""
+    href = (href or "").strip()
+    if not href or href.startswith("#") or href.lower().startswith("javascript:"):
+        return None
+    absolute_url = urljoin(base_url, href)
+    if SKIPPED_EXTENSIONS_RE.search(absolute_url):
+        return None
+    return absolute_url
+
+
+def document_base_url(page_url: str, base_href: Optional[str]) -> str:
+    """Base for relative links: <base href> (itself relative to the page URL) or the page URL"""
+    base_href = (base_href or "").strip()
+    return urljoin(page_url, base_href) if base_href else page_url
+
+
+def content_strings(root):
+    """
+    Text fragments of an lxml element without script/style/nav/footer/header subtrees,
+    comments and processing instructions
+    The tail of a skipped element stays a separate fragment, as with BeautifulSoup's
+    get_text(separator="\n"): "A<nav>menu</nav>B" gives "A" and "B", never "AB"
+    """
+    if root.text:
+        yield root.text
+    stack = [(root, iter(root))]
+    while stack:
+        element, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if stack and element.tail:
+                yield element.tail
+            continue
+        if not isinstance(child.tag, str) or child.tag in REMOVED_TAGS:
+            if child.tail:
+                yield child.tail
+            continue
+        if child.text:
+            yield child.text
+        stack.append((child, iter(child)))
+
+
+def _extract_lxml(html_content: str, base_url: Optional[str]) -> ExtractedPage:
+    document = lxml_html.document_fromstring(html_content)
+
+    links = []
+    if base_url is not None:
+        base_href = document.xpath("(//base[@href])[1]/@href")
+        base_url = document_base_url(base_url, base_href[0] if base_href else None)
+        for anchor in document.iter("a"):
+            link = filter_link(anchor.get("href"), base_url)
+            if link:
+                links.append(link)
+
+    main_content = None
+    for xpath in MAIN_CONTENT_XPATHS:
+        found = xpath(document)
+        if found:
+            main_content = found[0]
+            break
+    if main_content is None:
+        bodies = document.xpath("//body")
+        main_content = bodies[0] if bodies else document
+
+    return ExtractedPage(clean_text(content_strings(main_content)), links)
+
+
+def _extract_soup(html_content: str, base_url: Optional[str]) -> ExtractedPage:
+    soup = BeautifulSoup(html_content, "html.parser")
+
+    links = []
+    if base_url is not None:
+        base_tag = soup.find("base", href=True)
+        base_url = document_base_url(base_url, base_tag["href"] if base_tag else None)
+        for anchor in soup.select("a[href]"):
+            link = filter_link(anchor.get("href"), base_url)
+            if link:
+                links.append(link)
+
+    for element in soup(list(REMOVED_TAGS)):
+        element.decompose()
+
+    main_content = None
+    for selector in MAIN_CONTENT_SELECTORS:
+        main_content = soup.select_one(selector)
+        if main_content:
+            break
+    if not main_content:
+        main_content = soup.body if soup.body else soup
+
+    return ExtractedPage(clean_text(main_content.stripped_strings), links)
+
+
+def extract_page(html_content: str, base_url: Optional[str] = None) -> ExtractedPage:
+    """
+    Main-content text and outbound links from one parse
+    Links are only collected when base_url is given (relative links are resolved against it)
+    """
+    if not html_content or not html_content.strip():
+        return ExtractedPage("", [])
+
+    try:
+        return _extract_lxml(html_content, base_url)
+    except (etree.ParserError, ValueError) as e:
+        # e.g. an XML declaration with an encoding, which lxml refuses for str input
+        logger.debug("lxml could not parse page, using html.parser", error=str(e))
+        return _extract_soup(html_content, base_url)
+
+
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+_pool_unavailable = False
+
+
+def get_extraction_pool() -> Optional[ProcessPoolExecutor]:
+    """Per-worker extraction processes (None when disabled or they cannot be started)"""
+    global _extraction_pool
+    if _extraction_pool is None and not _pool_unavailable and settings.crawl_extraction_workers > 0:
+        # spawn: forking a worker that runs Playwright and an event loop is not safe
+        _extraction_pool = ProcessPoolExecutor(
+            max_workers=settings.crawl_extraction_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _extraction_pool
+
+
+async def extract_page_async(html_content: str, base_url: Optional[str] = None) -> ExtractedPage:
+    """extract_page off the event loop: in the extraction process pool, else in a thread"""
+    global _pool_unavailable
+    loop = asyncio.get_running_loop()
+
+    pool = get_extraction_pool()
+    if pool is not None:
+        try:
+            return await loop.run_in_executor(pool, extract_page, html_content, base_url)
+        except (AssertionError, OSError, RuntimeError) as e:
+            # e.g. daemonic worker processes may not start children, or a pool process died
+            logger.warning("Extraction process pool unavailable, using threads", error=str(e))
+            shutdown_extraction_pool()
+            _pool_unavailable = True
+
+    # lxml releases the GIL while parsing, so a thread still overlaps with the event loop
+    return await loop.run_in_executor(None, extract_page, html_content, base_url)
+
+
+def shutdown_extraction_pool() -> None:
+    global _extraction_pool
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown(wait=False, cancel_futures=True)
+        _extraction_pool = None
@@ -0,0 +1,161 @@
+"""
+정적 페이지 우선 fetcher
+대부분의 학교 게시판/공지 페이지는 서버 렌더링이므로 먼저 HTTP/2 httpx로 가져오고,
+내용이 비어 있거나 JS 렌더링으로 보이는 페이지만 Playwright로 넘깁니다.
+사이트(호스트)별 판단 결과는 Redis에 저장하여 다음 크롤링에서 probe를 건너뜁니다.
+URL 매니페스트의 ETag/Last-Modified로 조건부 요청을 보내 304면 다운로드/렌더링을 생략합니다.
+"""
+from typing import NamedTuple, Optional
+import os
+import re
+import httpx
+import structlog
+
+from config import settings
+from redis_client import get_redis_client
+from services.rate_limit import host_rate_limiter, is_throttled
+
+logger = structlog.get_logger()
+
+RENDER_MODE_STATIC = "static"
+RENDER_MODE_BROWSER = "browser"
+
+# SPA 마운트 포인트만 있고 내용이 없는 페이지
+EMPTY_APP_ROOT_RE = re.compile(
+    r'<div[^>]+id=["\'](?:app|root|__next|__nuxt)["\'][^>]*>\s*</div>',
+    re.IGNORECASE
+)
+NOSCRIPT_WARNING_RE = re.compile(
+    r"<noscript[^>]*>[^<]*(?:enable javascript|javascript.{0,20}(?:활성화|사용)|자바스크립트)",
+    re.IGNORECASE
+)
+
+
+# fetch_static 결과 상태
+FETCH_OK = "ok"
+FETCH_NOT_MODIFIED = "not_modified"
+FETCH_NOT_HTML = "not_html"
+FETCH_CLIENT_ERROR = "client_error"
+FETCH_RETRY = "retry"
+FETCH_FAILED = "failed"
+
+
+class StaticFetchResult(NamedTuple):
+    status: str
+    html: Optional[str] = None
+    validators: Optional[dict] = None
+    url: Optional[str] = None  # final URL after redirects (base for relative links)
+
+
+def conditional_headers(manifest_entry: Optional[dict]) -> dict:
+    """If-None-Match / If-Modified-Since headers from a URL manifest entry"""
+    headers = {}
+    if not manifest_entry:
+        return headers
+    if manifest_entry.get("etag"):
+        headers["If-None-Match"] = manifest_entry["etag"]
+    if manifest_entry.get("last_modified"):
+        headers["If-Modified-Since"] = manifest_entry["last_modified"]
+    return headers
+
+
+def response_validators(response: httpx.Response) -> dict:
+    """Cache validators to store in the URL manifest"""
+    return {
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified"),
+    }
+
+
+def render_mode_key(host: str) -> str:
+    return f"rag:crawl:render_mode:{host}"
+
+
+def get_render_mode(host: str) -> Optional[str]:
+    """Remembered fetch mode for a host ("static" / "browser"), None if unknown"""
+    try:
+        value = get_redis_client().get(render_mode_key(host))
+        return value.decode() if value else None
+    except Exception as e:
+        logger.warning("Failed to read render mode", host=host, error=str(e))
+        return None
+
+
+def set_render_mode(host: str, mode: str) -> None:
+    try:
+        get_redis_client().set(
+            render_mode_key(host),
+            mode,
+            ex=settings.crawl_render_mode_ttl_days * 24 * 3600
+        )
+    except Exception as e:
+        logger.warning("Failed to store render mode", host=host, error=str(e))
+
+
+def needs_browser(html: str, text: str) -> bool:
+    """Heuristic: does this page need JavaScript rendering to show its content?"""
+    if len(text) < settings.crawl_static_min_text_length:
+        return True
+    if EMPTY_APP_ROOT_RE.search(html):
+        return True
+    if NOSCRIPT_WARNING_RE.search(html) and len(text) < settings.crawl_static_min_text_length * 3:
+        return True
+    return False
+
+
+async def _observe_response(response: httpx.Response) -> None:
+    await host_rate_limiter.observe_async(
+        response.url.netloc.decode(), response.status_code, response.headers.get("retry-after")
+    )
+
+
+def create_http_client(user_agent: str) -> httpx.AsyncClient:
+    """
+    Pooled HTTP/2 client for static fetches (uses VPN_PROXY_URL when set)
+    Every response status is fed to the shared host rate limiter (429/5xx back off the host)
+    """
+    return httpx.AsyncClient(
+        event_hooks={"response": [_observe_response]},
+        http2=True,
+        follow_redirects=True,
+        timeout=httpx.Timeout(30.0, connect=10.0),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        headers={
+            "User-Agent": user_agent,
+            "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "ko-KR,ko;q=0.9,en;q=0.8",
+        },
+        proxy=os.getenv("VPN_PROXY_URL") or None
+    )
+
+
+async def fetch_static(client: httpx.AsyncClient, url: str, manifest_entry: Optional[dict] = None) -> StaticFetchResult:
+    """
+    Fetch a page without a browser (conditionally when the manifest has validators)
+    FETCH_NOT_HTML / FETCH_CLIENT_ERROR (404, 410, ...): nothing to crawl, a browser would get the same answer
+    FETCH_RETRY (429/5xx): the host is overloaded - fetch again later (the response hook already
+    recorded its Retry-After / backoff with the shared host throttle)
+    FETCH_FAILED (403): possibly a bot block - retry with the browser
+    FETCH_NOT_MODIFIED: unchanged since the last successful embedding
+    """
+    response = await client.get(url, headers=conditional_headers(manifest_entry))
+    if response.status_code == 304:
+        return StaticFetchResult(FETCH_NOT_MODIFIED)
+
+    if is_throttled(response.status_code):
+        logger.info("Static fetch throttled", url=url, status=response.status_code)
+        return StaticFetchResult(FETCH_RETRY)
+
+    if response.status_code == 403:
+        logger.info("Static fetch forbidden", url=url, status=response.status_code)
+        return StaticFetchResult(FETCH_FAILED)
+
+    if response.status_code >= 400:
+        logger.info("Static fetch client error", url=url, status=response.status_code)
+        return StaticFetchResult(FETCH_CLIENT_ERROR)
+
+    content_type = response.headers.get("content-type", "")
+    if content_type and "html" not in content_type:
+        return StaticFetchResult(FETCH_NOT_HTML)
+
+    return StaticFetchResult(FETCH_OK, response.text, response_validators(response), str(response.url))
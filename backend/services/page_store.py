@@ -0,0 +1,78 @@
+"""
+내용 주소 기반 페이지 텍스트 저장소 (로컬 디스크, zlib 압축)
+크롤러는 추출한 텍스트를 content_hash 이름의 파일로 저장하고 임베딩 태스크에는 해시만 넘깁니다.
+브로커 메시지가 작아지고, 같은 내용의 페이지는 한 번만 저장됩니다.
+크롤러와 임베딩 워커가 같은 디렉터리(PAGE_STORE_DIR, 공유 볼륨)를 봐야 합니다.
+Redis는 256MB allkeys-lru라 큰 텍스트를 넣으면 URL 매니페스트가 밀려날 수 있어 디스크를 사용합니다.
+"""
+from pathlib import Path
+from typing import Optional
+import hashlib
+import os
+import time
+import uuid
+import zlib
+import structlog
+
+from config import settings
+
+logger = structlog.get_logger()
+
+
+def content_hash(text: str) -> str:
+    """Content hash shared by the page store and the URL manifest (content_hash field)"""
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+def blob_path(text_hash: str) -> Path:
+    return Path(settings.page_store_dir) / text_hash[:2] / f"{text_hash}.z"
+
+
+def put_page_text(text: str) -> Optional[str]:
+    """Store page text and return its hash, or None if the store is unavailable"""
+    text_hash = content_hash(text)
+    path = blob_path(text_hash)
+
+    try:
+        if path.exists():
+            # Same content already stored: keep it alive for this crawl
+            os.utime(path)
+            return text_hash
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp_path.write_bytes(zlib.compress(text.encode('utf-8'), settings.page_store_compression_level))
+        os.replace(tmp_path, path)
+        return text_hash
+    except OSError as e:
+        logger.warning("Failed to store page text", hash=text_hash, error=str(e))
+        return None
+
+
+def get_page_text(text_hash: str) -> Optional[str]:
+    """Page text for a hash, None if it was purged or is unreadable"""
+    try:
+        return zlib.decompress(blob_path(text_hash).read_bytes()).decode('utf-8')
+    except (OSError, zlib.error) as e:
+        logger.warning("Page text not available", hash=text_hash, error=str(e))
+        return None
+
+
+def purge_stale_page_texts() -> None:
+    """Remove page texts whose embedding tasks should long be finished"""
+    directory = Path(settings.page_store_dir)
+    if not directory.exists():
+        return
+
+    cutoff = time.time() - settings.page_store_ttl_hours * 3600
+    removed = 0
+    for path in directory.glob("*/*"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError:
+            continue
+
+    if removed:
+        logger.info("Removed stale page texts", removed=removed)
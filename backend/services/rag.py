@@ -1,21 +1,31 @@
-from typing import List, Tuple, Optional
+from typing import AsyncIterator, List, Tuple, Optional
+import asyncio
 import structlog
 from langchain_ollama import OllamaEmbeddings
 from langchain_openai import ChatOpenAI
 from langchain.schema import SystemMessage, HumanMessage
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient
 from supabase_client import supabase
+from services.cache import RetrievalCache, make_cache_key, normalize_query, department_key
+from services.semantic_cache import SemanticAnswerCache
+from services.url_manifest import url_manifest
 
 from config import settings
 
 logger = structlog.get_logger()
 
+# Max source URLs cited for a single chunk shared by many pages
+MAX_SOURCES_PER_CHUNK = 3
+
+NO_RESULT_ANSWER = "죄송합니다. 충분히 관련성 높은 정보를 찾을 수 없습니다. 확장 모드를 사용하시거나 질문을 더 구체적으로 해주세요."
+
 
 class RAGService:
     """RAG service for question answering"""
 
     def __init__(self):
-        self.qdrant_client = QdrantClient(
+        # Async client so vector search never blocks the event loop
+        self.qdrant_client = AsyncQdrantClient(
             url=settings.qdrant_host,
             api_key=settings.qdrant_api_key
         )
@@ -32,7 +42,13 @@ class RAGService:
             model=settings.ollama_embedding_model,
             base_url=settings.ollama_host
         )
-    
+
+        # Query embedding / retrieval cache (local LRU + Redis)
+        self.cache = RetrievalCache()
+
+        # Answer cache for paraphrased questions
+        self.answer_cache = SemanticAnswerCache(self.qdrant_client)
+
     async def get_answer(self, question: str, mode: str = "filter", user_id: str = "anonymous") -> Tuple[str, List[str]]:
         """
         Get answer for a question using RAG
@@ -45,149 +61,312 @@ class RAGService:
         try:
             # Get user preferences for department-based search
             department_info = await self._get_user_department_info(user_id)
-            department_urls = department_info["urls"]
-            department_names = department_info["departments"]
-
-            # Enhance query with department info for better search results
-            enhanced_question = question
-            if department_info["enabled"] and department_names:
-                # Add department context to search query
-                dept_context = " ".join(department_names)
-                enhanced_question = f"{dept_context} {question}"
-                logger.info(
-                    "Enhanced search query with departments",
-                    original=question,
-                    enhanced=enhanced_question,
-                    departments=department_names
-                )
+            departments_key = self._departments_key(department_info)
 
             # Get query embedding (use enhanced question for better matching)
-            query_embedding = self._get_embedding(enhanced_question)
-
-            # Adjust search parameters based on mode
-            if mode == "expand":
-                # Expand mode: retrieve more documents for broader context
-                limit = settings.top_k * 3
-                score_threshold = 0.2  # Very low threshold for maximum coverage
-            else:
-                # Filter mode: STRICT - only highly relevant documents
-                limit = settings.top_k * 2
-                score_threshold = 0.5  # Higher threshold to ensure relevance
-                min_results = 2  # Minimum number of results required
-
-            # Search similar documents
-            search_results = self.qdrant_client.search(
-                collection_name=settings.qdrant_collection_name,
-                query_vector=query_embedding,
-                limit=limit,
-                score_threshold=score_threshold
+            query_embedding = await self._get_embedding(self._enhance_question(question, department_info))
+
+            # Paraphrases of an already answered question skip retrieval and GPT
+            cached = await self.answer_cache.lookup(query_embedding, mode, departments_key)
+            if cached is not None:
+                return cached["answer"], cached["sources"]
+
+            retrieval = await self._retrieve(question, mode, department_info, departments_key, query_embedding)
+            if retrieval["answer"] is not None:
+                return retrieval["answer"], retrieval["sources"]
+
+            # Generate answer using GPT
+            answer = await self._generate_answer(
+                retrieval["context"],
+                question,
+                mode,
+                retrieval["departments"]
             )
 
-            # Log search results for debugging
-            logger.info(
-                "Search results",
-                question=question,
-                mode=mode,
-                num_results=len(search_results),
-                scores=[f"{r.score:.4f}" for r in search_results[:3]],
-                urls=[r.payload.get("url", "")[:50] for r in search_results[:3]]
+            self._check_answer_content(answer, question, mode, retrieval["context"])
+
+            await self.answer_cache.store(
+                query_embedding,
+                mode,
+                departments_key,
+                question,
+                answer,
+                retrieval["sources"],
+                retrieval.get("content_hashes", {})
             )
 
-            # Filter mode: strict validation
-            if mode == "filter":
-                if not search_results or len(search_results) < min_results:
-                    return "죄송합니다. 충분히 관련성 높은 정보를 찾을 수 없습니다. 확장 모드를 사용하시거나 질문을 더 구체적으로 해주세요.", []
-
-                # Additional check: ensure results have decent scores
-                avg_score = sum(r.score for r in search_results) / len(search_results)
-                if avg_score < 0.55:
-                    return "죄송합니다. 충분히 관련성 높은 정보를 찾을 수 없습니다. 확장 모드를 사용하시거나 질문을 더 구체적으로 해주세요.", []
-
-            # Expand mode: try again without threshold if no results
-            if mode == "expand" and not search_results:
-                search_results = self.qdrant_client.search(
-                    collection_name=settings.qdrant_collection_name,
-                    query_vector=query_embedding,
-                    limit=limit
-                )
+            return answer, retrieval["sources"]
 
-            if not search_results:
-                return "죄송합니다. 충분히 관련성 높은 정보를 찾을 수 없습니다. 확장 모드를 사용하시거나 질문을 더 구체적으로 해주세요.", []
+        except Exception as e:
+            logger.error("Failed to get answer", question=question, mode=mode, error=str(e))
+            raise
 
-            # Apply department boosting if enabled
-            if department_info["enabled"] and (department_urls or department_names):
-                search_results = self._apply_department_boosting(
-                    search_results,
-                    department_urls,
-                    department_names
-                )
+    async def stream_answer(
+        self,
+        question: str,
+        mode: str = "filter",
+        user_id: str = "anonymous"
+    ) -> AsyncIterator[dict]:
+        """
+        Streaming variant of get_answer
+        Yields events in order:
+            {"event": "sources", "data": [...]}  - as soon as retrieval finishes
+            {"event": "token", "data": "..."}    - one per LLM chunk
+            {"event": "done", "data": ""}
+        """
+        department_info = await self._get_user_department_info(user_id)
+        departments_key = self._departments_key(department_info)
+        query_embedding = await self._get_embedding(self._enhance_question(question, department_info))
+
+        cached = await self.answer_cache.lookup(query_embedding, mode, departments_key)
+        if cached is not None:
+            yield {"event": "sources", "data": cached["sources"]}
+            yield {"event": "token", "data": cached["answer"]}
+            yield {"event": "done", "data": ""}
+            return
+
+        retrieval = await self._retrieve(question, mode, department_info, departments_key, query_embedding)
+        yield {"event": "sources", "data": retrieval["sources"]}
+
+        if retrieval["answer"] is not None:
+            yield {"event": "token", "data": retrieval["answer"]}
+            yield {"event": "done", "data": ""}
+            return
+
+        messages = self._build_messages(
+            retrieval["context"],
+            question,
+            mode,
+            retrieval["departments"]
+        )
 
-            # Extract documents and sources
-            documents = []
-            sources = set()
+        answer_parts = []
+        async for chunk in self.llm.astream(messages):
+            if chunk.content:
+                answer_parts.append(chunk.content)
+                yield {"event": "token", "data": chunk.content}
+
+        answer = "".join(answer_parts)
+        self._check_answer_content(answer, question, mode, retrieval["context"])
+
+        await self.answer_cache.store(
+            query_embedding,
+            mode,
+            departments_key,
+            question,
+            answer,
+            retrieval["sources"],
+            retrieval.get("content_hashes", {})
+        )
+        yield {"event": "done", "data": ""}
+
+    def _departments_key(self, department_info: dict) -> str:
+        """Stable key for the user's department set ("none" when disabled)"""
+        if not department_info["enabled"]:
+            return "none"
+        return make_cache_key(department_key(department_info["departments"], department_info["urls"]))
+
+    def _enhance_question(self, question: str, department_info: dict) -> str:
+        """Enhance query with department info for better search results"""
+        department_names = department_info["departments"]
+        if not (department_info["enabled"] and department_names):
+            return question
+
+        # Add department context to search query
+        dept_context = " ".join(department_names)
+        enhanced_question = f"{dept_context} {question}"
+        logger.info(
+            "Enhanced search query with departments",
+            original=question,
+            enhanced=enhanced_question,
+            departments=department_names
+        )
+        return enhanced_question
 
-            for result in search_results:
-                text = result.payload["text"]
-                documents.append(text)
-                sources.add(result.payload["url"])
-
-                # Log if suspicious content is found
-                if "경남" in text or "경북" in text or "부산" in text:
-                    logger.warning(
-                        "Suspicious content in search result",
-                        score=result.score,
-                        url=result.payload.get("url", ""),
-                        text_preview=text[:100]
-                    )
+    async def _retrieve(
+        self,
+        question: str,
+        mode: str,
+        department_info: dict,
+        departments_key: str,
+        query_embedding: List[float]
+    ) -> dict:
+        """
+        Run the retrieval half of the pipeline
+        Returns a dict with:
+            answer: fixed answer when nothing relevant was found (None otherwise)
+            sources: source URLs
+            context: joined document text for the LLM
+            departments: department names to mention in the prompt (or None)
+            content_hashes: {url: content_hash} of every cited source and chunk owner
+        """
+        # Retrieval results are cached per (query, mode, departments, collection version)
+        version = await self.cache.collection_version()
+        cache_key = make_cache_key(normalize_query(question), mode, departments_key, version)
+        cached = await self.cache.get("retrieval", cache_key)
+        if cached is not None:
+            logger.info("Retrieval cache hit", question=question, mode=mode, version=version)
+            return cached
+
+        retrieval = await self._retrieve_uncached(question, mode, department_info, query_embedding)
+        await self.cache.set("retrieval", cache_key, retrieval)
+        return retrieval
+
+    async def _retrieve_uncached(
+        self,
+        question: str,
+        mode: str,
+        department_info: dict,
+        query_embedding: List[float]
+    ) -> dict:
+        """Search Qdrant with the query embedding and build context"""
+        department_urls = department_info["urls"]
+        department_names = department_info["departments"]
+
+        # Adjust search parameters based on mode
+        if mode == "expand":
+            # Expand mode: retrieve more documents for broader context
+            limit = settings.top_k * 3
+            score_threshold = 0.2  # Very low threshold for maximum coverage
+        else:
+            # Filter mode: STRICT - only highly relevant documents
+            limit = settings.top_k * 2
+            score_threshold = 0.5  # Higher threshold to ensure relevance
+            min_results = 2  # Minimum number of results required
+
+        # Search similar documents
+        search_results = await self.qdrant_client.search(
+            collection_name=settings.qdrant_collection_name,
+            query_vector=query_embedding,
+            limit=limit,
+            score_threshold=score_threshold
+        )
 
-            # Build context
-            context = "\n\n".join(documents)
+        # Log search results for debugging
+        logger.info(
+            "Search results",
+            question=question,
+            mode=mode,
+            num_results=len(search_results),
+            scores=[f"{r.score:.4f}" for r in search_results[:3]],
+            urls=[r.payload.get("url", "")[:50] for r in search_results[:3]]
+        )
 
-            # Log context preview
-            logger.info(
-                "Context built",
-                context_length=len(context),
-                context_preview=context[:200]
+        # Filter mode: strict validation
+        if mode == "filter":
+            if not search_results or len(search_results) < min_results:
+                return {"answer": NO_RESULT_ANSWER, "sources": []}
+
+            # Additional check: ensure results have decent scores
+            avg_score = sum(r.score for r in search_results) / len(search_results)
+            if avg_score < 0.55:
+                return {"answer": NO_RESULT_ANSWER, "sources": []}
+
+        # Expand mode: try again without threshold if no results
+        if mode == "expand" and not search_results:
+            search_results = await self.qdrant_client.search(
+                collection_name=settings.qdrant_collection_name,
+                query_vector=query_embedding,
+                limit=limit
             )
 
-            # Generate answer using GPT
-            answer = await self._generate_answer(
-                context,
-                question,
-                mode,
-                department_names if department_info["enabled"] else None
+        if not search_results:
+            return {"answer": NO_RESULT_ANSWER, "sources": []}
+
+        # Apply department boosting if enabled
+        if department_info["enabled"] and (department_urls or department_names):
+            search_results = self._apply_department_boosting(
+                search_results,
+                department_urls,
+                department_names
             )
 
-            # Log if answer contains suspicious content
-            if "경남" in answer or "경북" in answer or "부산" in answer:
-                logger.error(
-                    "⚠️ CRITICAL: Answer contains non-Ewha content!",
-                    mode=mode,
-                    question=question,
-                    answer_preview=answer[:200],
-                    context_preview=context[:200]
+        # Extract documents and sources
+        documents = []
+        sources = set()
+        content_hashes = {}
+
+        for result in search_results:
+            text = result.payload["text"]
+            documents.append(text)
+            # Shared chunks (boilerplate) list every URL they appear on - cite a few of them
+            sources.update(self._result_urls(result.payload)[:MAX_SOURCES_PER_CHUNK])
+            # The chunk payload carries the owner page's hash
+            content_hashes[result.payload["url"]] = result.payload.get("content_hash", "")
+
+            # Log if suspicious content is found
+            if "경남" in text or "경북" in text or "부산" in text:
+                logger.warning(
+                    "Suspicious content in search result",
+                    score=result.score,
+                    url=result.payload.get("url", ""),
+                    text_preview=text[:100]
                 )
 
-            return answer, list(sources)
+        # Cited pages that share a chunk without owning it: their hash comes from the URL manifest
+        shared_sources = [url for url in sources if url not in content_hashes]
+        if shared_sources:
+            loop = asyncio.get_running_loop()
+            entries = await loop.run_in_executor(None, url_manifest.get_many, shared_sources)
+            for url in shared_sources:
+                content_hashes[url] = (entries.get(url) or {}).get("content_hash", "")
+
+        # Build context
+        context = "\n\n".join(documents)
+
+        # Log context preview
+        logger.info(
+            "Context built",
+            context_length=len(context),
+            context_preview=context[:200]
+        )
 
-        except Exception as e:
-            logger.error("Failed to get answer", question=question, mode=mode, error=str(e))
-            raise
-    
-    def _get_embedding(self, text: str) -> List[float]:
-        """Get embedding for text"""
-        return self.embeddings_client.embed_query(text)
+        return {
+            "answer": None,
+            "sources": list(sources),
+            "context": context,
+            "departments": department_names if department_info["enabled"] else None,
+            "content_hashes": content_hashes
+        }
+
+    def _check_answer_content(self, answer: str, question: str, mode: str, context: str):
+        """Log if answer contains suspicious content"""
+        if "경남" in answer or "경북" in answer or "부산" in answer:
+            logger.error(
+                "⚠️ CRITICAL: Answer contains non-Ewha content!",
+                mode=mode,
+                question=question,
+                answer_preview=answer[:200],
+                context_preview=context[:200]
+            )
+
+    async def _get_embedding(self, text: str) -> List[float]:
+        """Get embedding for text (non-blocking, cached)"""
+        cache_key = make_cache_key(settings.ollama_embedding_model, normalize_query(text))
+        embedding = await self.cache.get("embedding", cache_key)
+        if embedding is not None:
+            return embedding
+
+        embedding = await self.embeddings_client.aembed_query(text)
+        await self.cache.set("embedding", cache_key, embedding)
+        return embedding
+
+    def _fetch_user_preferences(self, user_id: str) -> list:
+        """Blocking Supabase lookup for user preferences"""
+        response = supabase.table("user_preferences").select("*").eq("user_id", user_id).execute()
+        return response.data or []
     
     async def _get_user_department_info(self, user_id: str) -> dict:
         """Get user's preferred department information from database"""
         try:
-            # Get user preferences
-            response = supabase.table("user_preferences").select("*").eq("user_id", user_id).execute()
+            # Supabase client is synchronous - run it in the thread pool
+            loop = asyncio.get_running_loop()
+            rows = await loop.run_in_executor(None, self._fetch_user_preferences, user_id)
 
-            if not response.data or len(response.data) == 0:
+            if not rows:
                 return {"enabled": False, "departments": [], "urls": []}
 
-            user_prefs = response.data[0]
+            user_prefs = rows[0]
 
             # Check if department search is enabled
             if not user_prefs.get("department_search_enabled", False):
@@ -222,6 +401,10 @@ class RAGService:
             logger.error("Failed to get user department info", user_id=user_id, error=str(e))
             return {"enabled": False, "departments": [], "urls": []}
 
+    def _result_urls(self, payload: dict) -> List[str]:
+        """URLs a chunk appears on (owner URL first)"""
+        return payload.get("urls") or [payload.get("url", "")]
+
     def _apply_department_boosting(
         self,
         search_results: List,
@@ -237,7 +420,7 @@ class RAGService:
             other_results = []
 
             for result in search_results:
-                result_url = result.payload.get("url", "")
+                result_urls = self._result_urls(result.payload)
                 result_text = result.payload.get("text", "")
 
                 is_from_department = False
@@ -247,6 +430,7 @@ class RAGService:
                     is_from_department = any(
                         dept_url and (dept_url in result_url or result_url in dept_url)
                         for dept_url in department_urls
+                        for result_url in result_urls
                     )
 
                 # If not matched by URL, check by department name in text or URL
@@ -258,7 +442,7 @@ class RAGService:
 
                         # Check in URL and text
                         if dept_name_core and (
-                            dept_name_core in result_url or
+                            any(dept_name_core in result_url for result_url in result_urls) or
                             dept_name_core in result_text or
                             dept_name in result_text
                         ):
@@ -301,6 +485,18 @@ class RAGService:
         user_departments: List[str] = None
     ) -> str:
         """Generate answer using GPT"""
+        messages = self._build_messages(context, question, mode, user_departments)
+        response = await self.llm.ainvoke(messages)
+        return response.content
+
+    def _build_messages(
+        self,
+        context: str,
+        question: str,
+        mode: str = "filter",
+        user_departments: List[str] = None
+    ) -> list:
+        """Build system/user prompt messages for GPT"""
 
         # Build user context info
         user_context = ""
@@ -430,5 +626,4 @@ class RAGService:
 {question}""")
         ]
 
-        response = await self.llm.ainvoke(messages)
-        return response.content
\ No newline at end of file
+        return messages
\ No newline at end of file
@@ -0,0 +1,280 @@
+"""
+모든 워커가 공유하는 호스트별 요청 속도 제한 (Redis)
+크롤러(asyncio)와 임베딩 fetcher(동기) 모두 같은 호스트 키를 사용하므로
+워커 동시성을 늘려도 한 호스트로 가는 전체 요청 속도와 동시 요청 수는 설정값을 넘지 않습니다.
+- 토큰 버킷 (HASH): 초당 rate개 충전, 최대 burst개
+- 동시 요청 슬롯 (ZSET): 요청 중인 holder, score = 만료 시각 (워커가 죽어도 슬롯이 회수됨)
+- 적응형 백오프: 429/5xx 응답이면 호스트 전체를 잠시 멈추고 속도를 절반으로, 정상 응답마다 서서히 복구
+"""
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional
+import asyncio
+import random
+import time
+import uuid
+import structlog
+
+from config import settings
+from redis_client import get_redis_client
+
+logger = structlog.get_logger()
+
+# 슬롯을 잡은 워커가 죽었을 때 회수되기까지의 시간 (Playwright goto 타임아웃보다 길게)
+SLOT_LEASE_MS = 120000
+# 동시 요청 슬롯이 모두 찼을 때 다시 시도하는 간격
+SLOT_POLL_MS = 100
+# 백오프 시 속도를 최대 1/32까지 낮춤
+MAX_BACKOFF_FACTOR = 32
+
+# KEYS: bucket, slots | ARGV: rate, burst, concurrency, holder, lease ms, poll ms, ttl ms
+# Returns 0 when the request may start, otherwise milliseconds to wait
+ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'blocked_until', 'backoff')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+local blocked_until = tonumber(state[3]) or 0
+local backoff = tonumber(state[4]) or 1
+
+if blocked_until > now then
+    return math.max(1, math.ceil(blocked_until - now))
+end
+
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[3]) then
+    return tonumber(ARGV[6])
+end
+
+rate = rate / backoff
+tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+if tokens < 1 then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+    return math.max(1, math.ceil((1 - tokens) * 1000 / rate))
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'ts', now)
+redis.call('ZADD', KEYS[2], now + tonumber(ARGV[5]), ARGV[4])
+redis.call('PEXPIRE', KEYS[1], ARGV[7])
+redis.call('PEXPIRE', KEYS[2], ARGV[7])
+return 0
+"""
+
+# KEYS: bucket | ARGV: throttled (1/0), retry-after ms, base pause ms, max pause ms, max backoff factor
+FEEDBACK_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local backoff = tonumber(redis.call('HGET', KEYS[1], 'backoff')) or 1
+
+if ARGV[1] == '1' then
+    backoff = math.min(backoff * 2, tonumber(ARGV[5]))
+    local pause = math.min(math.max(tonumber(ARGV[2]), tonumber(ARGV[3]) * backoff), tonumber(ARGV[4]))
+    local blocked_until = tonumber(redis.call('HGET', KEYS[1], 'blocked_until')) or 0
+    redis.call('HSET', KEYS[1], 'backoff', tostring(backoff), 'blocked_until', math.max(blocked_until, now + pause))
+    return backoff
+end
+
+if backoff > 1 then
+    redis.call('HSET', KEYS[1], 'backoff', tostring(math.max(1, backoff * 0.9)))
+end
+return backoff
+"""
+
+
+class HostPolicy(NamedTuple):
+    rate: float  # requests per second across all workers
+    concurrency: int  # requests in flight across all workers
+    burst: int
+
+
+def host_bucket_key(host: str) -> str:
+    return f"rag:crawl:rate:{host}"
+
+
+def host_slots_key(host: str) -> str:
+    return f"rag:crawl:slots:{host}"
+
+
+@lru_cache(maxsize=8)
+def parse_host_limits(value: str) -> Dict[str, HostPolicy]:
+    """
+    CRAWL_HOST_LIMITS: comma-separated "host=rate:concurrency[:burst]" entries
+    A host also matches its subdomains (ewha.ac.kr=2:4 covers cse.ewha.ac.kr)
+    """
+    limits = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        host, spec = item.split("=", 1)
+        parts = spec.strip().split(":")
+        try:
+            rate = float(parts[0])
+            concurrency = int(parts[1]) if len(parts) > 1 else settings.crawl_per_host_concurrency
+            burst = int(parts[2]) if len(parts) > 2 else settings.crawl_host_burst
+        except ValueError:
+            logger.warning("Invalid host rate limit", entry=item)
+            continue
+        limits[host.strip().lower()] = HostPolicy(rate, max(1, concurrency), max(1, burst))
+    return limits
+
+
+def host_policy(host: str) -> HostPolicy:
+    """Most specific CRAWL_HOST_LIMITS entry for the host, else the default policy"""
+    limits = parse_host_limits(settings.crawl_host_limits)
+    host = host.lower()
+    while host:
+        if host in limits:
+            return limits[host]
+        host = host.partition(".")[2]
+
+    return HostPolicy(
+        1.0 / max(settings.crawl_min_request_interval, 0.001),
+        max(1, settings.crawl_per_host_concurrency),
+        max(1, settings.crawl_host_burst)
+    )
+
+
+def retry_after_ms(value: Optional[str]) -> int:
+    """Retry-After header (seconds or HTTP date) in milliseconds, 0 if absent or invalid"""
+    if not value:
+        return 0
+    try:
+        return max(0, int(float(value) * 1000))
+    except ValueError:
+        pass
+    try:
+        return max(0, int((parsedate_to_datetime(value).timestamp() - time.time()) * 1000))
+    except (TypeError, ValueError):
+        return 0
+
+
+def is_throttled(status_code: int) -> bool:
+    """Responses that mean the host wants us to slow down"""
+    return status_code == 429 or status_code >= 500
+
+
+class HostRateLimiter:
+    """Per-host token bucket + concurrency limit shared by every crawler and embedding worker"""
+
+    def __init__(self):
+        self._acquire = None
+        self._feedback = None
+
+    def _scripts(self):
+        if self._acquire is None:
+            redis = get_redis_client()
+            self._acquire = redis.register_script(ACQUIRE_SCRIPT)
+            self._feedback = redis.register_script(FEEDBACK_SCRIPT)
+        return self._acquire, self._feedback
+
+    def try_acquire(self, host: str, holder: str) -> float:
+        """0 when the holder got a slot, otherwise seconds to wait before trying again"""
+        policy = host_policy(host)
+        acquire, _ = self._scripts()
+        wait_ms = acquire(
+            keys=[host_bucket_key(host), host_slots_key(host)],
+            args=[
+                policy.rate,
+                policy.burst,
+                policy.concurrency,
+                holder,
+                SLOT_LEASE_MS,
+                SLOT_POLL_MS,
+                settings.crawl_backoff_max_seconds * 1000 + SLOT_LEASE_MS
+            ]
+        )
+        if not wait_ms:
+            return 0.0
+        # Jitter so waiting workers do not retry in lockstep
+        return wait_ms / 1000 + random.uniform(0, 0.05)
+
+    def release(self, host: str, holder: str) -> None:
+        try:
+            get_redis_client().zrem(host_slots_key(host), holder)
+        except Exception as e:
+            logger.warning("Failed to release host slot", host=host, error=str(e))
+
+    def observe(self, host: str, status_code: int, retry_after: Optional[str] = None) -> None:
+        """Feed a response status back: 429/5xx back off the whole host, other responses recover"""
+        throttled = is_throttled(status_code)
+        try:
+            _, feedback = self._scripts()
+            backoff = feedback(
+                keys=[host_bucket_key(host)],
+                args=[
+                    1 if throttled else 0,
+                    retry_after_ms(retry_after),
+                    settings.crawl_backoff_base_seconds * 1000,
+                    settings.crawl_backoff_max_seconds * 1000,
+                    MAX_BACKOFF_FACTOR
+                ]
+            )
+        except Exception as e:
+            logger.warning("Failed to record host response", host=host, error=str(e))
+            return
+
+        if throttled:
+            logger.warning(
+                "Host is throttling us, backing off",
+                host=host,
+                status=status_code,
+                retry_after=retry_after,
+                backoff=backoff
+            )
+
+    async def observe_async(self, host: str, status_code: int, retry_after: Optional[str] = None) -> None:
+        """observe() in a thread, for the crawler's event loop"""
+        await asyncio.to_thread(self.observe, host, status_code, retry_after)
+
+    def _fallback_wait(self, host: str, error: Exception) -> float:
+        # Redis down: only the local minimum interval applies
+        logger.warning("Shared rate limit unavailable", host=host, error=str(error))
+        return 1.0 / host_policy(host).rate
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        """Async: wait for a token and a free concurrency slot for the host"""
+        # The Redis client is synchronous: its calls run in threads so they never block the event loop
+        holder = uuid.uuid4().hex
+        while True:
+            try:
+                wait = await asyncio.to_thread(self.try_acquire, host, holder)
+            except Exception as e:
+                await asyncio.sleep(self._fallback_wait(host, e))
+                break
+            if not wait:
+                break
+            await asyncio.sleep(wait)
+
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self.release, host, holder)
+
+    @contextmanager
+    def hold(self, host: str):
+        """Blocking variant of slot() for synchronous fetchers"""
+        holder = uuid.uuid4().hex
+        while True:
+            try:
+                wait = self.try_acquire(host, holder)
+            except Exception as e:
+                time.sleep(self._fallback_wait(host, e))
+                break
+            if not wait:
+                break
+            time.sleep(wait)
+
+        try:
+            yield
+        finally:
+            self.release(host, holder)
+
+
+# 전역 인스턴스
+host_rate_limiter = HostRateLimiter()
@@ -0,0 +1,108 @@
+"""
+적응형 재크롤링 스케줄
+URL 매니페스트에 쌓인 검사/변경 횟수(임베딩 시점의 content_hash 비교 결과)로 URL별 변경 빈도를 추정하고,
+야간 크롤링은 "지금 다시 가면 바뀌어 있을 확률"이 가장 높은 URL을 폴더 예산(recrawl_budget)만큼만 다시 방문합니다.
+선택은 실행할 때마다 매니페스트에서 다시 계산하므로 (heapq) Redis에 별도 큐를 남기지 않습니다.
+후보는 크롤러 BFS와 같은 범위(사이트와 같은 호스트)의 URL 중 임베딩된 내용(content_hash)이 있는 것입니다.
+링크만 있는 목록 페이지처럼 내용이 없는 항목은 예약하지 않고, 크롤 중 링크로 다시 방문됩니다.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import heapq
+import math
+import time
+import structlog
+
+from services.discovery import url_in_scope
+from services.url_manifest import url_manifest
+
+logger = structlog.get_logger()
+
+RECRAWL_FULL = "full"
+RECRAWL_ADAPTIVE = "adaptive"
+
+# Gamma prior for the change rate: pages without history are assumed to change about once a week
+PRIOR_CHANGES = 1.0
+PRIOR_DAYS = 7.0
+
+SECONDS_PER_DAY = 86400
+
+
+def change_rate(entry: dict, now: float) -> float:
+    """Posterior mean of the per-day change rate (Poisson changes, Gamma prior)"""
+    first_checked = float(entry.get("first_checked") or now)
+    observed_days = max(0.0, (now - first_checked) / SECONDS_PER_DAY)
+    return (entry.get("changes", 0) + PRIOR_CHANGES) / (observed_days + PRIOR_DAYS)
+
+
+def recrawl_priority(entry: dict, now: float) -> float:
+    """Probability that the page changed since it was last crawled"""
+    last_crawled = entry.get("last_crawled")
+    if not last_crawled:
+        return 1.0
+
+    try:
+        elapsed_days = (now - datetime.fromisoformat(last_crawled).timestamp()) / SECONDS_PER_DAY
+    except ValueError:
+        return 1.0
+
+    return 1.0 - math.exp(-change_rate(entry, now) * max(0.0, elapsed_days))
+
+
+def is_scheduled_entry(entry: Optional[dict]) -> bool:
+    """Pages with embedded content are scheduled by change rate; others are reached through links"""
+    return entry is not None and bool(entry.get("content_hash"))
+
+
+def site_for_url(url: str, site_urls: List[str]) -> Optional[str]:
+    """
+    The site whose crawl reaches the URL: the BFS follows every same-host link,
+    so the host decides; a site whose directory contains the URL wins among sites of one host
+    """
+    host = urlsplit(url).netloc
+    same_host = [site_url for site_url in site_urls if urlsplit(site_url).netloc == host]
+    for site_url in same_host:
+        if url_in_scope(url, site_url):
+            return site_url
+    return same_host[0] if same_host else None
+
+
+def select_recrawl_urls(folder_id: str, site_urls: List[str], budget: int) -> Optional[Dict[str, List[str]]]:
+    """
+    The `budget` most likely changed URLs of the folder's sites
+    Returns {site_url: [urls]} for every site with history (possibly an empty list),
+    or None when the manifest has no history for these sites yet
+    """
+    candidates = {}
+    for url in url_manifest.urls():
+        site_url = site_for_url(url, site_urls)
+        if site_url is not None:
+            candidates[url] = site_url
+
+    if not candidates:
+        return None
+
+    now = time.time()
+    entries = url_manifest.get_many(candidates.keys())
+    scores = {
+        url: recrawl_priority(entry, now)
+        for url, entry in entries.items()
+        if is_scheduled_entry(entry)
+    }
+
+    selected = heapq.nlargest(max(0, budget), scores.items(), key=lambda item: item[1])
+
+    by_site = {site_url: [] for site_url in set(candidates.values())}
+    for url, _ in selected:
+        by_site[candidates[url]].append(url)
+
+    logger.info(
+        "Adaptive recrawl selection",
+        folder_id=folder_id,
+        candidates=len(scores),
+        selected=len(selected),
+        budget=budget,
+        min_priority=f"{selected[-1][1]:.3f}" if selected else None
+    )
+    return dict(by_site)
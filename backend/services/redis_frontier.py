@@ -0,0 +1,168 @@
+"""
+분산 크롤링용 Redis 프론티어
+같은 crawl id를 가진 여러 크롤러 워커(shard)가 하나의 프론티어를 공유합니다.
+- seen (SET): 정규화 URL 중복 제거
+- queue (LIST): 대기 중인 [원래 url, depth]
+- leases (ZSET): 워커가 가져간 항목, score = 임대 만료 시각. 만료된 항목은 큐로 되돌아갑니다 (워커 장애 대비)
+- done (SET): 처리 완료 URL
+키가 지워지면 크롤이 조용히 끝나 버리므로 캐시용 LRU Redis가 아니라 noeviction 상태 Redis에 저장합니다.
+모든 메서드는 블로킹 Redis 호출이므로 크롤러 이벤트 루프에서는 asyncio.to_thread로 호출합니다.
+"""
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import json
+import threading
+import time
+import structlog
+
+from config import settings
+from redis_client import get_state_redis_client
+from services.url_frontier import canonicalize_url
+
+logger = structlog.get_logger()
+
+# KEYS: seen, queue | ARGV: member (json), url
+ADD_SCRIPT = """
+if redis.call('SADD', KEYS[1], ARGV[2]) == 1 then
+    redis.call('RPUSH', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# KEYS: queue, leases | ARGV: now, lease expiry, batch size
+LEASE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for _, member in ipairs(expired) do
+    redis.call('ZREM', KEYS[2], member)
+    redis.call('LPUSH', KEYS[1], member)
+end
+local leased = {}
+for i = 1, tonumber(ARGV[3]) do
+    local member = redis.call('LPOP', KEYS[1])
+    if not member then break end
+    redis.call('ZADD', KEYS[2], ARGV[2], member)
+    table.insert(leased, member)
+end
+return leased
+"""
+
+
+class RedisFrontier:
+    """Shared frontier for one distributed crawl (same add / pop / len interface as UrlFrontier)"""
+
+    def __init__(self, crawl_id: str):
+        self.crawl_id = crawl_id
+        prefix = f"rag:crawl:{crawl_id}"
+        self.seen_key = f"{prefix}:seen"
+        self.queue_key = f"{prefix}:queue"
+        self.leases_key = f"{prefix}:leases"
+        self.done_key = f"{prefix}:done"
+        self.meta_key = f"{prefix}:meta"
+
+        self.redis = get_state_redis_client()
+        self._add = self.redis.register_script(ADD_SCRIPT)
+        self._lease = self.redis.register_script(LEASE_SCRIPT)
+        self._buffer = deque()
+        self._leased: Dict[str, bytes] = {}
+        # pop() is called from several threads at once (one per crawl worker)
+        self._pop_lock = threading.Lock()
+
+    @property
+    def _keys(self) -> List[str]:
+        return [self.seen_key, self.queue_key, self.leases_key, self.done_key, self.meta_key]
+
+    def initialize(self, shards: int) -> bool:
+        """Create crawl metadata; False if the crawl already exists (retried coordinator)"""
+        created = self.redis.hsetnx(self.meta_key, "shards", shards)
+        self.redis.hset(self.meta_key, "started_at", time.time())
+        self.touch()
+        return bool(created)
+
+    def touch(self) -> None:
+        """Keep the crawl's keys alive while it is running"""
+        pipe = self.redis.pipeline(transaction=False)
+        for key in self._keys:
+            pipe.expire(key, settings.crawl_distributed_ttl_hours * 3600)
+        pipe.execute()
+
+    def add(self, url: str, depth: int) -> bool:
+        """Queue a URL unless any shard already queued or visited it"""
+        canonical = canonicalize_url(url)
+        member = json.dumps([url.strip(), depth])
+        return bool(self._add(keys=[self.seen_key, self.queue_key], args=[member, canonical]))
+
+    def add_many(self, urls: List[str], depth: int) -> None:
+        """add() for several URLs in one round trip"""
+        if not urls:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for url in urls:
+            self._add(
+                keys=[self.seen_key, self.queue_key],
+                args=[json.dumps([url.strip(), depth]), canonicalize_url(url)],
+                client=pipe
+            )
+        pipe.execute()
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Next (url, depth), leasing a batch from Redis when the local buffer is empty"""
+        with self._pop_lock:
+            if not self._buffer:
+                now = time.time()
+                leased = self._lease(
+                    keys=[self.queue_key, self.leases_key],
+                    args=[now, now + settings.crawl_distributed_lease_seconds, settings.crawl_distributed_lease_size]
+                )
+                if leased:
+                    self.touch()
+                for member in leased:
+                    url, depth = json.loads(member)
+                    self._leased[url] = member
+                    self._buffer.append((url, depth))
+
+            if not self._buffer:
+                return None
+            return self._buffer.popleft()
+
+    def requeue(self, url: str, depth: int) -> None:
+        """Return a leased URL to the end of the shared queue without marking it done"""
+        member = self._leased.pop(url, None) or json.dumps([url, depth])
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.rpush(self.queue_key, member)
+        pipe.zrem(self.leases_key, member)
+        pipe.execute()
+
+    def mark_done(self, url: str) -> None:
+        member = self._leased.pop(url, None)
+        pipe = self.redis.pipeline(transaction=False)
+        if member is not None:
+            pipe.zrem(self.leases_key, member)
+        pipe.sadd(self.done_key, canonicalize_url(url))
+        pipe.execute()
+
+    def is_drained(self) -> bool:
+        """No queued URLs and no URL leased by any shard"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.llen(self.queue_key)
+        pipe.zcard(self.leases_key)
+        queued, leased = pipe.execute()
+        return queued == 0 and leased == 0 and not self._buffer
+
+    def finish_shard(self) -> Optional[int]:
+        """Record a finished shard; the last one gets the crawl's page count and removes its keys"""
+        finished = self.redis.hincrby(self.meta_key, "finished_shards", 1)
+        shards = int(self.redis.hget(self.meta_key, "shards") or 0)
+        if finished < shards or not self.is_drained():
+            return None
+
+        pages = self.redis.scard(self.done_key)
+        self.redis.delete(*self._keys)
+        return pages
+
+    def __len__(self) -> int:
+        return self.redis.llen(self.queue_key) + len(self._buffer)
+
+    @property
+    def seen_count(self) -> int:
+        return self.redis.scard(self.seen_key)
@@ -0,0 +1,155 @@
+"""
+의미 기반 답변 캐시
+질문 임베딩이 기존 질문과 충분히 비슷하면 (코사인 유사도 ≥ 임계값) 저장된 답변을 재사용하여
+gpt-4o-mini 호출을 건너뜁니다.
+
+캐시는 별도 Qdrant 컬렉션에 저장되며, 임베딩 작업이 어떤 URL의 content_hash 변경을 감지하면
+invalidate_cached_answers()로 해당 URL을 인용한 답변을 삭제합니다.
+"""
+from typing import Dict, List, Optional
+import time
+import uuid
+import structlog
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    Filter,
+    FieldCondition,
+    MatchValue,
+    Range,
+    FilterSelector,
+)
+
+from config import settings
+
+logger = structlog.get_logger()
+
+
+def answer_cache_collection_name() -> str:
+    """Qdrant collection used for cached answers"""
+    return f"{settings.qdrant_collection_name}_answer_cache"
+
+
+def invalidate_cached_answers(qdrant_client: QdrantClient, url: str) -> None:
+    """Drop every cached answer that cites the given URL (sync, for Celery tasks)"""
+    if not settings.semantic_cache_enabled:
+        return
+
+    try:
+        if not qdrant_client.collection_exists(answer_cache_collection_name()):
+            return
+
+        qdrant_client.delete(
+            collection_name=answer_cache_collection_name(),
+            points_selector=FilterSelector(
+                filter=Filter(must=[FieldCondition(key="urls", match=MatchValue(value=url))])
+            )
+        )
+        logger.info("Invalidated cached answers for URL", url=url)
+    except Exception as e:
+        logger.warning("Failed to invalidate cached answers", url=url, error=str(e))
+
+
+class SemanticAnswerCache:
+    """Answer cache keyed by query-embedding similarity"""
+
+    def __init__(self, qdrant_client: AsyncQdrantClient):
+        self.qdrant_client = qdrant_client
+        self.enabled = settings.semantic_cache_enabled
+        self.threshold = settings.semantic_cache_threshold
+        self.ttl_seconds = settings.semantic_cache_ttl_seconds
+        self._collection_ready = False
+
+    async def _ensure_collection(self, vector_size: int) -> None:
+        if self._collection_ready:
+            return
+
+        name = answer_cache_collection_name()
+        if not await self.qdrant_client.collection_exists(name):
+            await self.qdrant_client.create_collection(
+                collection_name=name,
+                vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
+            )
+            logger.info("Created answer cache collection", name=name)
+        self._collection_ready = True
+
+    async def lookup(self, query_vector: List[float], mode: str, departments_key: str) -> Optional[dict]:
+        """Return {"answer", "sources", "score"} for the closest cached answer, or None"""
+        if not self.enabled:
+            return None
+
+        try:
+            await self._ensure_collection(len(query_vector))
+            results = await self.qdrant_client.search(
+                collection_name=answer_cache_collection_name(),
+                query_vector=query_vector,
+                query_filter=Filter(must=[
+                    FieldCondition(key="mode", match=MatchValue(value=mode)),
+                    FieldCondition(key="departments_key", match=MatchValue(value=departments_key)),
+                    FieldCondition(key="created_at", range=Range(gte=time.time() - self.ttl_seconds)),
+                ]),
+                limit=1,
+                score_threshold=self.threshold,
+                with_payload=True
+            )
+        except Exception as e:
+            logger.warning("Semantic cache lookup failed", error=str(e))
+            return None
+
+        if not results:
+            return None
+
+        payload = results[0].payload
+        logger.info(
+            "Semantic cache hit",
+            score=f"{results[0].score:.4f}",
+            cached_question=payload.get("question", "")[:50]
+        )
+        return {
+            "answer": payload["answer"],
+            "sources": payload.get("sources", []),
+            "score": results[0].score
+        }
+
+    async def store(
+        self,
+        query_vector: List[float],
+        mode: str,
+        departments_key: str,
+        question: str,
+        answer: str,
+        sources: List[str],
+        content_hashes: Dict[str, str]
+    ) -> None:
+        """
+        Cache an answer together with the content_hash of every cited URL
+        `urls` (used for invalidation) covers every source shown with the answer
+        """
+        if not self.enabled:
+            return
+
+        try:
+            await self._ensure_collection(len(query_vector))
+            await self.qdrant_client.upsert(
+                collection_name=answer_cache_collection_name(),
+                points=[
+                    PointStruct(
+                        id=str(uuid.uuid4()),
+                        vector=query_vector,
+                        payload={
+                            "mode": mode,
+                            "departments_key": departments_key,
+                            "question": question,
+                            "answer": answer,
+                            "sources": sources,
+                            "urls": sorted(set(sources) | set(content_hashes)),
+                            "content_hashes": content_hashes,
+                            "created_at": time.time()
+                        }
+                    )
+                ]
+            )
+        except Exception as e:
+            logger.warning("Failed to store answer in semantic cache", error=str(e))
@@ -0,0 +1,86 @@
+"""
+크롤링 프론티어와 URL 정규화
+- canonicalize_url: #anchor, 쿼리 순서, 트래킹 파라미터 차이로 같은 페이지가 중복 방문되지 않도록 정규화
+  정규화 URL은 중복 검사 키로만 쓰고, 요청/임베딩/매니페스트에는 처음 발견된 원래 URL을 사용합니다
+  (기존에 원래 URL로 저장된 포인트와 매니페스트 항목이 그대로 갱신되도록)
+- UrlFrontier: BFS 큐 + set 기반 멤버십 인덱스 (O(1) 중복 검사)
+"""
+from collections import deque
+from typing import Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 페이지 내용과 무관한 트래킹 파라미터
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid",
+    "_ga", "_gl", "mc_cid", "mc_eid", "igshid", "ref_src",
+}
+TRACKING_PARAM_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of a URL used as the deduplication key (never fetched or stored)
+    - lowercase scheme and host, drop default ports
+    - drop the #fragment
+    - drop tracking parameters and sort the remaining query parameters
+    - empty path becomes "/"
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    netloc = host
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username + (f":{parts.password}" if parts.password else "")
+        netloc = f"{userinfo}@{netloc}"
+
+    query_params = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ]
+    query = urlencode(sorted(query_params), doseq=True)
+
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+class UrlFrontier:
+    """BFS frontier of (original url, depth) with an O(1) seen-set over canonical URLs"""
+
+    def __init__(self):
+        self._queue = deque()
+        self._seen = set()
+
+    def add(self, url: str, depth: int) -> bool:
+        """Queue a URL unless it was already queued or visited; returns True if added"""
+        canonical = canonicalize_url(url)
+        if canonical in self._seen:
+            return False
+
+        self._seen.add(canonical)
+        self._queue.append((url.strip(), depth))
+        return True
+
+    def requeue(self, url: str, depth: int) -> None:
+        """Put a popped URL back at the end of the queue (fetch it again later)"""
+        self._queue.append((url, depth))
+
+    def pop(self) -> Optional[Tuple[str, int]]:
+        """Next (url, depth) in BFS order, or None when empty"""
+        if not self._queue:
+            return None
+        return self._queue.popleft()
+
+    def __contains__(self, url: str) -> bool:
+        return canonicalize_url(url) in self._seen
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    @property
+    def seen_count(self) -> int:
+        return len(self._seen)
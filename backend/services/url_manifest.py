@@ -0,0 +1,155 @@
+"""
+URL 매니페스트 (Redis, 퇴출되지 않는 상태용 인스턴스)
+URL별 content_hash, last_crawled, etag, chunk_count, point_ids를 Redis 해시에 저장하여
+크롤링/임베딩 시 URL마다 Qdrant를 scroll하지 않고 O(1)로 조회합니다.
+etag/last_modified는 임베딩이 끝난 뒤에만 기록되므로 304 응답은 "이미 색인된 내용과 같음"을 뜻합니다.
+links는 크롤러가 304 페이지에서도 링크를 따라갈 수 있도록 저장한 아웃링크 목록입니다
+(따라갈 수 있는 같은 호스트 링크만, 중복 제거, CRAWL_MANIFEST_MAX_LINKS 이하일 때만 저장).
+checks/changes/first_checked/last_changed는 적응형 재크롤링의 변경 빈도 모델에 쓰입니다.
+매니페스트가 LRU로 지워지면 304/변경 감지가 깨지므로 캐시용 Redis가 아닌 get_state_redis_client()에 저장합니다.
+"""
+from typing import Dict, Iterable, List, Optional
+import json
+import time
+import structlog
+
+from config import settings
+from redis_client import get_state_redis_client
+
+logger = structlog.get_logger()
+
+# JSON으로 저장되는 필드
+JSON_FIELDS = {"point_ids", "links"}
+INT_FIELDS = {"chunk_count", "checks", "changes"}
+
+
+class UrlManifest:
+    """
+    url → {content_hash, last_crawled, etag, last_modified, chunk_count, point_ids, links,
+           checks, changes, first_checked, last_changed}
+    """
+
+    def __init__(self):
+        self.prefix = f"rag:manifest:{settings.qdrant_collection_name}"
+
+    def _key(self, url: str) -> str:
+        return f"{self.prefix}:{url}"
+
+    def _decode(self, raw: dict) -> Optional[dict]:
+        if not raw:
+            return None
+
+        entry = {}
+        for field, value in raw.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            value = value.decode() if isinstance(value, bytes) else value
+            if field in JSON_FIELDS:
+                value = json.loads(value)
+            elif field in INT_FIELDS:
+                value = int(value)
+            entry[field] = value
+        return entry
+
+    def _encode(self, fields: dict) -> dict:
+        encoded = {}
+        for field, value in fields.items():
+            if value is None:
+                continue
+            encoded[field] = json.dumps(value) if field in JSON_FIELDS else value
+        return encoded
+
+    def get(self, url: str) -> Optional[dict]:
+        """Return the manifest entry for a URL (None if missing or Redis is unavailable)"""
+        try:
+            return self._decode(get_state_redis_client().hgetall(self._key(url)))
+        except Exception as e:
+            logger.warning("Manifest lookup failed", url=url, error=str(e))
+            return None
+
+    def get_many(self, urls: Iterable[str]) -> Dict[str, Optional[dict]]:
+        """Bulk lookup in one Redis round trip"""
+        urls = list(urls)
+        if not urls:
+            return {}
+
+        try:
+            pipe = get_state_redis_client().pipeline(transaction=False)
+            for url in urls:
+                pipe.hgetall(self._key(url))
+            return {url: self._decode(raw) for url, raw in zip(urls, pipe.execute())}
+        except Exception as e:
+            logger.warning("Manifest bulk lookup failed", count=len(urls), error=str(e))
+            return {url: None for url in urls}
+
+    def update(self, url: str, **fields) -> None:
+        """Set (merge) fields for a URL"""
+        mapping = self._encode(fields)
+        if not mapping:
+            return
+
+        try:
+            get_state_redis_client().hset(self._key(url), mapping=mapping)
+        except Exception as e:
+            logger.warning("Manifest update failed", url=url, error=str(e))
+
+    def update_many(self, entries: Dict[str, dict]) -> None:
+        """Set fields for several URLs in one round trip"""
+        if not entries:
+            return
+
+        try:
+            pipe = get_state_redis_client().pipeline(transaction=False)
+            for url, fields in entries.items():
+                mapping = self._encode(fields)
+                if mapping:
+                    pipe.hset(self._key(url), mapping=mapping)
+            pipe.execute()
+        except Exception as e:
+            logger.warning("Manifest bulk update failed", count=len(entries), error=str(e))
+
+    def record_checks(self, observations: Dict[str, bool]) -> None:
+        """Count one crawl check per URL, and a content change where it changed (atomic increments)"""
+        if not observations:
+            return
+
+        now = time.time()
+        try:
+            pipe = get_state_redis_client().pipeline(transaction=False)
+            for url, changed in observations.items():
+                key = self._key(url)
+                pipe.hsetnx(key, "first_checked", now)
+                pipe.hincrby(key, "checks", 1)
+                if changed:
+                    pipe.hincrby(key, "changes", 1)
+                    pipe.hset(key, "last_changed", now)
+            pipe.execute()
+        except Exception as e:
+            logger.warning("Manifest check recording failed", count=len(observations), error=str(e))
+
+    def clear(self, url: str, *fields: str) -> None:
+        """Remove fields from a URL's entry"""
+        try:
+            get_state_redis_client().hdel(self._key(url), *fields)
+        except Exception as e:
+            logger.warning("Manifest field removal failed", url=url, error=str(e))
+
+    def delete(self, url: str) -> None:
+        try:
+            get_state_redis_client().delete(self._key(url))
+        except Exception as e:
+            logger.warning("Manifest delete failed", url=url, error=str(e))
+
+    def urls(self) -> List[str]:
+        """All URLs in the manifest (SCAN, for maintenance jobs)"""
+        prefix_len = len(self.prefix) + 1
+        try:
+            return [
+                (key.decode() if isinstance(key, bytes) else key)[prefix_len:]
+                for key in get_state_redis_client().scan_iter(match=f"{self.prefix}:*", count=1000)
+            ]
+        except Exception as e:
+            logger.warning("Manifest scan failed", error=str(e))
+            return []
+
+
+url_manifest = UrlManifest()
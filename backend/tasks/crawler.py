@@ -1,26 +1,50 @@
 from celery import Task
+from celery.signals import worker_process_init, worker_process_shutdown
 from celery_app import celery_app
-from typing import Set, List, Dict
+from typing import Set, List, Optional
 import asyncio
 from urllib.parse import urljoin, urlparse
 import structlog
-from playwright.async_api import async_playwright
-from collections import deque
 import uuid
 import json
 from pathlib import Path
-from bs4 import BeautifulSoup
 import re
 
-from tasks.embeddings import process_url_for_embedding
-from tasks.embeddings import process_url_for_embedding_incremental, process_url_for_embedding_smart
+from config import settings
+from tasks.embeddings import get_kst_now, queue_page_for_embedding
+from services.url_frontier import UrlFrontier, canonicalize_url
+from services.crawl_checkpoint import CheckpointedFrontier, purge_stale_checkpoints
+from services.page_store import purge_stale_page_texts
+from services.extraction import extract_page_async, shutdown_extraction_pool
+from services.redis_frontier import RedisFrontier
+from services.rate_limit import host_rate_limiter
+from services.render_profile import apply_render_profile
+from services.discovery import DISCOVERY_BFS, DISCOVERY_FEED, DiscoveryResult, discover_changed_urls
+from services.recrawl import is_scheduled_entry
+from services.url_manifest import url_manifest
+from services.browser_pool import (
+    get_browser_pool,
+    run_on_worker_loop,
+    init_worker_browser_pool,
+    shutdown_worker_browser_pool,
+)
+from services.page_fetcher import (
+    FETCH_CLIENT_ERROR,
+    FETCH_NOT_HTML,
+    FETCH_NOT_MODIFIED,
+    FETCH_OK,
+    FETCH_RETRY,
+    RENDER_MODE_BROWSER,
+    RENDER_MODE_STATIC,
+    create_http_client,
+    fetch_static,
+    get_render_mode,
+    needs_browser,
+    set_render_mode,
+)
 
 logger = structlog.get_logger()
 
-# Domain-level locks for concurrent crawl prevention
-domain_locks = {}
-domain_locks_lock = asyncio.Lock()
-
 # File download URL patterns to skip
 FILE_DOWNLOAD_PATTERNS = [
     r'download',
@@ -60,10 +84,12 @@ USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36 Edg/119.0.0.0",
 ]
 
+# Single precompiled matcher for all file download patterns
+FILE_DOWNLOAD_RE = re.compile("|".join(f"(?:{pattern})" for pattern in FILE_DOWNLOAD_PATTERNS), re.IGNORECASE)
+
 def is_file_download_url(url: str) -> bool:
     """Check if URL is a file download endpoint"""
-    url_lower = url.lower()
-    return any(re.search(pattern, url_lower) for pattern in FILE_DOWNLOAD_PATTERNS)
+    return FILE_DOWNLOAD_RE.search(url) is not None
 
 def get_random_user_agent() -> str:
     """Get a random User-Agent from the pool"""
@@ -71,6 +97,18 @@ def get_random_user_agent() -> str:
     return random.choice(USER_AGENTS)
 
 
+@worker_process_init.connect
+def setup_browser_pool(**kwargs):
+    """Each worker process keeps one event loop and one browser for all its crawls"""
+    init_worker_browser_pool()
+
+
+@worker_process_shutdown.connect
+def teardown_browser_pool(**kwargs):
+    shutdown_worker_browser_pool()
+    shutdown_extraction_pool()
+
+
 class CrawlerTask(Task):
     """Base crawler task with retry configuration"""
     autoretry_for = (Exception,)
@@ -79,221 +117,514 @@ class CrawlerTask(Task):
 
 
 @celery_app.task(base=CrawlerTask, name="crawl_website")
-def crawl_website(task_id: str, root_url: str, max_depth: int = 2):
+def crawl_website(
+    task_id: str,
+    root_url: str,
+    max_depth: int = 2,
+    resource_allowlist: Optional[List[str]] = None,
+    discovery_mode: str = DISCOVERY_BFS,
+    distributed: bool = False
+):
     """
     웹사이트 크롤링: 지정된 루트 URL에서 시작하여 최대 깊이까지 링크를 수집합니다.
     크롤링 후 스마트 임베딩 처리 작업을 큐에 추가합니다.
+    task_id별 체크포인트가 있으므로 재시도되면 중단된 지점부터 이어서 크롤링합니다.
+    distributed=True이면 Redis 프론티어를 만들고 여러 워커에 crawl_website_shard를 분배합니다.
     """
     logger.info("🔵 웹사이트 크롤링 시작", task_id=task_id, root_url=root_url, max_depth=max_depth)
 
-    # Run async crawler
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    # Run async crawler on the worker's long-lived loop (the pooled browser is bound to it)
+    if distributed:
+        return run_on_worker_loop(
+            start_distributed_crawl(task_id, root_url, max_depth, resource_allowlist, discovery_mode)
+        )
 
     try:
-        url_data_dict = loop.run_until_complete(
-            crawl_async(root_url, max_depth)
+        pages_found = run_on_worker_loop(
+            crawl_async(root_url, max_depth, resource_allowlist, discovery_mode, crawl_id=task_id)
         )
 
-        logger.info(f"🔵 웹사이트 크롤링 완료 - {len(url_data_dict)}개 URL 발견", task_id=task_id)
+        logger.info(f"🔵 웹사이트 크롤링 완료 - {pages_found}개 URL 발견", task_id=task_id)
         logger.info(f"✅ 모든 페이지가 크롤링과 동시에 임베딩 큐에 추가되었습니다", task_id=task_id)
 
         return {
             "task_id": task_id,
             "status": "completed",
-            "urls_found": len(url_data_dict),
-            "urls": list(url_data_dict.keys())
+            "urls_found": pages_found
         }
 
     except Exception as e:
         logger.error("🔴 웹사이트 크롤링 실패", task_id=task_id, error=str(e))
         raise
+
+
+@celery_app.task(base=CrawlerTask, name="crawl_website_shard")
+def crawl_website_shard(
+    task_id: str,
+    root_url: str,
+    max_depth: int = 2,
+    resource_allowlist: Optional[List[str]] = None,
+    shard_index: int = 0
+):
+    """
+    분산 크롤링 shard: 공유 Redis 프론티어에서 URL 묶음을 임대(lease)해 크롤링합니다.
+    프론티어가 모든 shard에서 비면 종료하며, 마지막 shard가 크롤 상태를 정리합니다.
+    """
+    logger.info("🛰️ 분산 크롤링 shard 시작", task_id=task_id, shard=shard_index, root_url=root_url)
+    try:
+        pages_found = run_on_worker_loop(
+            crawl_async(root_url, max_depth, resource_allowlist, crawl_id=task_id, distributed=True)
+        )
+    except Exception as e:
+        logger.error("🔴 분산 크롤링 shard 실패", task_id=task_id, shard=shard_index, error=str(e))
+        raise
+
+    total_pages = RedisFrontier(task_id).finish_shard()
+    if total_pages is not None:
+        logger.info(f"🔵 분산 크롤링 완료 - {total_pages}개 URL", task_id=task_id)
+
+    return {
+        "task_id": task_id,
+        "shard": shard_index,
+        "status": "completed",
+        "urls_found": pages_found
+    }
+
+
+async def discover_feed_urls(http_client, root_url: str) -> Optional[DiscoveryResult]:
+    """Changed URLs reported by sitemaps/feeds, None when discovery failed"""
+    try:
+        return await discover_changed_urls(http_client, root_url)
+    except Exception as e:
+        logger.warning(f"⚠️ Feed discovery failed for {root_url}: {str(e)}")
+        return None
+
+
+async def seed_frontier(frontier, http_client, root_url: str, max_depth: int, discovery_mode: str) -> None:
+    """Root URL for a BFS crawl, plus (feed mode) the changed URLs reported by sitemaps/feeds"""
+    discovery = None
+    if discovery_mode == DISCOVERY_FEED:
+        discovery = await discover_feed_urls(http_client, root_url)
+
+    if discovery is not None and discovery.replaces_bfs:
+        # Incremental crawl: a dated sitemap lists every page, so only changed ones are fetched, without following links
+        logger.info(f"🗺️ {len(discovery.changed_urls)} changed URLs from sitemap/feed for {root_url}")
+        for url in discovery.changed_urls:
+            frontier.add(url, max_depth)
+        return
+
+    frontier.add(root_url, 0)
+    if discovery is not None and discovery.changed_urls:
+        # Feeds only list recent posts: extra seeds on top of BFS, as if linked from the root
+        logger.info(f"🗺️ {len(discovery.changed_urls)} changed URLs from feeds added to BFS for {root_url}")
+        for url in discovery.changed_urls:
+            frontier.add(url, 1)
+
+
+async def start_distributed_crawl(
+    task_id: str,
+    root_url: str,
+    max_depth: int,
+    resource_allowlist: Optional[List[str]],
+    discovery_mode: str
+) -> dict:
+    """Seed the shared Redis frontier and fan the crawl out to crawl_website_shard tasks"""
+    shards = max(1, settings.crawl_distributed_shards)
+    frontier = RedisFrontier(task_id)
+    if not frontier.initialize(shards):
+        # Retried coordinator: the shards were already dispatched
+        logger.info("🛰️ Distributed crawl already started", task_id=task_id)
+        return {"task_id": task_id, "status": "dispatched", "shards": shards}
+
+    http_client = create_http_client(get_random_user_agent())
+    try:
+        await seed_frontier(frontier, http_client, root_url, max_depth, discovery_mode)
     finally:
-        loop.close()
+        await http_client.aclose()
+
+    for shard_index in range(shards):
+        crawl_website_shard.delay(task_id, root_url, max_depth, resource_allowlist, shard_index)
 
+    logger.info(f"🛰️ 분산 크롤링 시작 - {shards}개 shard", task_id=task_id, queued=len(frontier))
+    return {"task_id": task_id, "status": "dispatched", "shards": shards}
 
-async def crawl_async(root_url: str, max_depth: int) -> Dict[str, str]:
+
+async def crawl_async(
+    root_url: str,
+    max_depth: int,
+    resource_allowlist: Optional[List[str]] = None,
+    discovery_mode: str = DISCOVERY_BFS,
+    crawl_id: Optional[str] = None,
+    distributed: bool = False,
+    seed_urls: Optional[List[str]] = None
+) -> int:
     """
-    Optimized async crawler using Playwright and BFS
-    Returns a dictionary of {url: text_content} to avoid re-fetching during embedding
+    Optimized async crawler using a static-first fetcher and BFS
+    Pages are fetched over HTTP/2 first; only pages that look empty or JS-rendered
+    are loaded in Playwright (a context on the worker's pooled browser, acquired on first need)
+    Browser contexts block images/fonts/stylesheets/media/trackers except for resource_allowlist entries
+    Pages answering 304 to a conditional GET are not re-embedded; their links come from the manifest
+    discovery_mode="feed" crawls only entries newer than the manifest when a dated sitemap exists;
+    otherwise it runs BFS with changed RSS/Atom items as extra seeds
+    With a crawl_id the frontier lives in a SQLite checkpoint, so a retried crawl resumes where it stopped
+    distributed=True runs as one shard of a crawl whose frontier is shared through Redis
+    Request rate and concurrency per host are limited across all workers (services.rate_limit)
+    seed_urls (adaptive recrawl) revisits those pages, the root and (feed mode) pages reported as changed,
+    following only links to pages the schedule does not cover (new or without content)
+    Page texts go straight to the embedding queue and no per-URL state is kept in memory;
+    returns the number of pages crawled (counted from the checkpoint when one is used)
     """
-    import random
     import os
 
     domain = urlparse(root_url).netloc
 
-    # Acquire domain-level semaphore to limit concurrent crawling of same domain
-    # 3개까지 동시 크롤링 허용 (1개 → 3개로 완화)
-    async with domain_locks_lock:
-        if domain not in domain_locks:
-            domain_locks[domain] = asyncio.Semaphore(3)  # 동시에 3개까지!
-        semaphore = domain_locks[domain]
-
-    # Wait for semaphore - up to 3 crawlers per domain at a time
-    async with semaphore:
-        logger.info(f"🔒 Acquired crawl slot for domain: {domain} (3 concurrent allowed)")
-
-        # Add random initial delay to prevent overwhelming servers when multiple crawls start simultaneously
-        initial_delay = random.uniform(5.0, 15.0)
-        logger.info(f"🌐 Starting crawl of {root_url} (max_depth={max_depth}) - waiting {initial_delay:.1f}s before start")
-        await asyncio.sleep(initial_delay)
-
-        visited_urls = set()
-        url_texts = {}  # Store URL -> text_content mapping
-        to_visit = deque([(root_url, 0)])  # (url, depth)
-
-        logger.info(f"🌐 Now crawling {root_url}")
-
-        # Select a random User-Agent for this crawl session
-        selected_user_agent = get_random_user_agent()
-        logger.info(f"🎭 Using User-Agent: {selected_user_agent[:50]}...")
-
-        # Get VPN proxy URL from environment variable
-        vpn_proxy_url = os.getenv("VPN_PROXY_URL")
-        proxy_config = None
-        if vpn_proxy_url:
-            proxy_config = {"server": vpn_proxy_url}
-            logger.info(f"🔐 Using VPN proxy: {vpn_proxy_url}")
-
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-dev-shm-usage']  # Better Docker compatibility
-            )
-            context = await browser.new_context(
-                user_agent=selected_user_agent,
-                proxy=proxy_config
-            )
-
+    # Every request to the host goes through the Redis token bucket shared by all workers,
+    # so concurrent crawls of the same site no longer need a per-domain crawl lock
+    logger.info(f"🌐 Starting crawl of {root_url} (max_depth={max_depth})")
+    purge_stale_page_texts()
+
+    pages_found = 0  # crawled or not modified (304); the URLs themselves live in the frontier
+    checkpoint = None
+    shared_frontier = None
+    if distributed:
+        # Leases URL batches from the frontier shared by every shard of this crawl
+        shared_frontier = RedisFrontier(crawl_id)
+        frontier = shared_frontier
+    elif crawl_id and settings.crawl_checkpoint_enabled:
+        purge_stale_checkpoints()
+        # Disk-backed frontier + visited set, committed every few pages
+        checkpoint = CheckpointedFrontier(crawl_id)
+        frontier = checkpoint
+        pages_found = checkpoint.done_count
+    else:
+        frontier = UrlFrontier()  # BFS queue of (canonical url, depth) with O(1) dedup
+
+    # Frontier that has to be told when a page is finished
+    tracker = shared_frontier if shared_frontier is not None else checkpoint
+
+    logger.info(f"🌐 Now crawling {root_url}")
+
+    # Select a random User-Agent for this crawl session
+    selected_user_agent = get_random_user_agent()
+    logger.info(f"🎭 Using User-Agent: {selected_user_agent[:50]}...")
+
+    # Get VPN proxy URL from environment variable
+    vpn_proxy_url = os.getenv("VPN_PROXY_URL")
+    proxy_config = None
+    if vpn_proxy_url:
+        proxy_config = {"server": vpn_proxy_url}
+        logger.info(f"🔐 Using VPN proxy: {vpn_proxy_url}")
+
+    # Remembered per-site decision: skip the static probe for JS-rendered sites
+    render_mode = get_render_mode(domain)
+    fetch_stats = {"static": 0, "escalated": 0, "browser": 0, "not_modified": 0}
+    logger.info(f"🧭 Render mode for {domain}: {render_mode or 'unknown (probing)'}")
+
+    http_client = create_http_client(selected_user_agent)
+    browser_pool = get_browser_pool()
+    browser_state = {}
+    browser_lock = asyncio.Lock()
+
+    async def get_browser_context():
+        """Context on the pooled browser, acquired on first use (and again if the browser crashed)"""
+        async with browser_lock:
+            context = browser_state.get("context")
+            if context is not None and not browser_pool.is_usable(context):
+                logger.warning(f"🧭 Browser crashed during crawl of {domain}, reacquiring")
+                await browser_pool.release_context(context)
+                context = None
+
+            if context is None:
+                context = await browser_pool.acquire_context(
+                    user_agent=selected_user_agent,
+                    proxy=proxy_config
+                )
+                await apply_render_profile(context, resource_allowlist)
+                browser_state["context"] = context
+            return context
+
+    # Per-host token bucket + concurrency limit shared with every other crawl and the embedding fetcher
+    throttle = host_rate_limiter
+    in_flight = 0
+    retries = {}  # url -> times requeued after 429/5xx
+
+    async def render_with_browser(current_url: str):
+        """Load a page in Playwright; returns (rendered html, final url)"""
+        context = await get_browser_context()
+        page = await context.new_page()
+        browser_pool.record_page()
+
+        try:
+            # Retry logic for connection issues
+            max_retries = 3
+            retry_count = 0
+            page_loaded = False
+
+            # File download URLs should fail fast without retries
+            if is_file_download_url(current_url):
+                max_retries = 1
+
+            while retry_count < max_retries and not page_loaded:
+                try:
+                    # Per-host concurrency cap + minimum interval between requests
+                    async with throttle.slot(domain):
+                        # Set a more reasonable timeout for faster crawling
+                        response = await page.goto(current_url, wait_until="domcontentloaded", timeout=30000)
+                    if response is not None:
+                        await throttle.observe_async(domain, response.status, response.headers.get("retry-after"))
+                    page_loaded = True
+                except Exception as goto_error:
+                    retry_count += 1
+                    if retry_count < max_retries and browser_pool.is_usable(context):
+                        wait_time = retry_count * 5  # 5s, 10s, 15s
+                        logger.warning(f"⚠️ Failed to load {current_url} (attempt {retry_count}/{max_retries}), retrying in {wait_time}s: {str(goto_error)}")
+                        await asyncio.sleep(wait_time)
+                    else:
+                        raise  # Re-raise on final attempt (or when the browser is gone)
+
+            # Links are parsed from the rendered DOM together with the text
+            return await page.content(), page.url
+        finally:
+            # Close on every path so failed pages do not pile up in the long-lived browser
             try:
-                while to_visit:
-                    current_url, depth = to_visit.popleft()
-
-                    if current_url in visited_urls or depth > max_depth:
-                        continue
-
-                    # Skip file download URLs
-                    if is_file_download_url(current_url):
-                        logger.info(f"⏭️ Skipping file download URL: {current_url}")
-                        visited_urls.add(current_url)
-                        continue
-
-                    try:
-                        page = await context.new_page()
-
-                        # Retry logic for connection issues
-                        max_retries = 3
-                        retry_count = 0
-                        page_loaded = False
-
-                        # File download URLs should fail fast without retries
-                        if is_file_download_url(current_url):
-                            max_retries = 1
-
-                        while retry_count < max_retries and not page_loaded:
-                            try:
-                                # Set a more reasonable timeout for faster crawling
-                                await page.goto(current_url, wait_until="domcontentloaded", timeout=30000)
-                                page_loaded = True
-                            except Exception as goto_error:
-                                retry_count += 1
-                                if retry_count < max_retries:
-                                    wait_time = retry_count * 5  # 5s, 10s, 15s
-                                    logger.warning(f"⚠️ Failed to load {current_url} (attempt {retry_count}/{max_retries}), retrying in {wait_time}s: {str(goto_error)}")
-                                    await asyncio.sleep(wait_time)
-                                else:
-                                    raise  # Re-raise on final attempt
-
-                        visited_urls.add(current_url)
-
-                        # Extract text content from the page
-                        try:
-                            html_content = await page.content()
-                            soup = BeautifulSoup(html_content, 'html.parser')
-
-                            # Remove script and style elements
-                            for script in soup(["script", "style", "nav", "footer", "header"]):
-                                script.decompose()
-
-                            # Try to find main content areas
-                            main_content = None
-                            for tag in ['main', 'article', 'div[role="main"]', '.content', '#content']:
-                                main_content = soup.select_one(tag)
-                                if main_content:
-                                    break
-
-                            # If no main content found, use body
-                            if not main_content:
-                                main_content = soup.body if soup.body else soup
-
-                            # Extract text
-                            text = main_content.get_text(separator='\n', strip=True)
-                            # Clean up text
-                            lines = [line.strip() for line in text.split('\n') if line.strip()]
-                            text_content = '\n'.join(lines)
-
-                            # 🔥 즉시 임베딩 작업 큐에 추가 (메모리에 저장 안 함!)
-                            if text_content.strip():
-                                try:
-                                    process_url_for_embedding_smart.delay(current_url, text_content)
-                                    logger.info(f"✅ Embedding queued for: {current_url}")
-                                except Exception as embed_error:
-                                    logger.warning(f"Failed to queue embedding for {current_url}: {str(embed_error)}")
-
-                            # 통계용으로만 URL 카운트 (텍스트는 저장 안 함)
-                            url_texts[current_url] = ""
-
-                        except Exception as e:
-                            logger.warning(f"Failed to extract text from {current_url}: {str(e)}")
-                            url_texts[current_url] = ""
-
-                        logger.info(f"🌐 Crawled: {current_url}", depth=depth, total_found=len(visited_urls))
-
-                        # 요청 사이에 지연 추가 (너무 많은 동시 요청 방지)
-                        await asyncio.sleep(2.0)  # 2초 지연으로 크롤링 속도 제한
-
-                        if depth < max_depth:
-                            # Extract all links more efficiently
-                            links = await page.evaluate('''
-                                () => {
-                                    const links = Array.from(document.querySelectorAll('a[href]'));
-                                    return links.map(a => a.href)
-                                        .filter(href => {
-                                            if (!href || href.startsWith('#') || href.startsWith('javascript:')) {
-                                                return false;
-                                            }
-                                            const lower = href.toLowerCase();
-                                            return !lower.match(/\.(pdf|jpg|jpeg|png|gif|zip|doc|docx|xls|xlsx|ppt|pptx)$/)
-                                        });
-                                }
-                            ''')
-
-                            # Filter and add new URLs (skip file download URLs)
-                            for link in links:
-                                try:
-                                    absolute_url = urljoin(current_url, link)
-                                    parsed = urlparse(absolute_url)
-
-                                    # Skip file download URLs
-                                    if is_file_download_url(absolute_url):
-                                        continue
-
-                                    # Only follow same domain links
-                                    if (parsed.netloc == domain and
-                                        absolute_url not in visited_urls and
-                                        absolute_url not in [item[0] for item in to_visit]):
-                                        to_visit.append((absolute_url, depth + 1))
-                                except Exception:
-                                    continue  # Skip invalid URLs
-
-                        await page.close()
-
-                    except Exception as e:
-                        logger.warning(f"⚠️ Failed to crawl {current_url}: {str(e)}")
-                        continue
-
+                await page.close()
+            except Exception:
+                pass
+
+    def followable_links(current_url: str, links: List[str]) -> List[str]:
+        """
+        Same-domain links without file downloads, in page order
+        Duplicates are detected on the canonical form, but each link keeps its original URL
+        """
+        candidates = {}
+        for link in links:
+            try:
+                absolute_url = urljoin(current_url, link)
+                parsed = urlparse(absolute_url)
+
+                # Skip file download URLs
+                if is_file_download_url(absolute_url):
+                    continue
+
+                # Only follow same domain links (frontier skips already seen URLs)
+                if parsed.netloc == domain:
+                    candidates.setdefault(canonicalize_url(absolute_url), absolute_url)
+            except Exception:
+                continue  # Skip invalid URLs
+        return list(candidates.values())
+
+    async def frontier_call(method, *args):
+        """The Redis frontier blocks on network round trips: run it in a thread (in-memory/SQLite inline)"""
+        if shared_frontier is not None:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def enqueue_links(current_url: str, links: List[str], depth: int):
+        """Filter and add new URLs (skip file download URLs)"""
+        candidates = followable_links(current_url, links)
+
+        if seed_urls is not None and candidates:
+            # Adaptive recrawl: pages with content are scheduled by their change rate,
+            # follow only new pages and link-only pages (which the schedule never selects)
+            known = await asyncio.to_thread(url_manifest.get_many, set(candidates))
+            candidates = [url for url in candidates if not is_scheduled_entry(known.get(url))]
+
+        if shared_frontier is not None:
+            await asyncio.to_thread(shared_frontier.add_many, candidates, depth + 1)
+        else:
+            for url in candidates:
+                frontier.add(url, depth + 1)
+
+    async def crawl_page(current_url: str, depth: int) -> bool:
+        """
+        Fetch one page, queue its text for embedding and add its links to the frontier
+        Returns True when the page was put back in the frontier to be fetched again (not done)
+        """
+        # Skip file download URLs
+        if is_file_download_url(current_url):
+            logger.info(f"⏭️ Skipping file download URL: {current_url}")
+            return False
+
+        nonlocal pages_found
+        want_links = depth < max_depth
+
+        try:
+            html_content = None
+            text_content = None
+            links = []
+            validators = {}
+
+            # 1. Static fetch (HTTP/2), unless this site is known to need JS
+            if render_mode != RENDER_MODE_BROWSER:
+                # Conditional GET only when a 304 still lets us follow this page's links
+                # Manifest lookups are blocking Redis round trips: keep them off the crawl loop
+                manifest_entry = await asyncio.to_thread(url_manifest.get, current_url)
+                if manifest_entry and want_links and "links" not in manifest_entry:
+                    manifest_entry = None
+
+                fetched = None
+                try:
+                    async with throttle.slot(domain):
+                        fetched = await fetch_static(http_client, current_url, manifest_entry)
+                except Exception as fetch_error:
+                    logger.info(f"Static fetch error for {current_url}, using browser: {str(fetch_error)}")
+
+                if fetched and fetched.status == FETCH_NOT_MODIFIED:
+                    # Unchanged since it was last embedded: no extraction, no embedding
+                    fetch_stats["not_modified"] += 1
+                    pages_found += 1
+                    await asyncio.to_thread(url_manifest.update, current_url, last_crawled=get_kst_now().isoformat())
+                    await asyncio.to_thread(url_manifest.record_checks, {current_url: False})
+                    logger.info(f"♻️ Not modified (304): {current_url}", depth=depth)
+                    if want_links:
+                        await enqueue_links(current_url, manifest_entry.get("links") or [], depth)
+                    return False
+
+                if fetched and fetched.status == FETCH_RETRY:
+                    # 429/5xx: the shared throttle is already backing the host off, so the next slot() waits
+                    attempts = retries.get(current_url, 0) + 1
+                    if attempts <= settings.crawl_page_max_retries:
+                        retries[current_url] = attempts
+                        logger.info(f"⏳ Host busy, requeueing {current_url}", attempt=attempts)
+                        await frontier_call(frontier.requeue, current_url, depth)
+                        return True
+                    logger.warning(f"⚠️ Giving up on {current_url} after {attempts - 1} retries")
+                    return False
+
+                if fetched and fetched.status in (FETCH_NOT_HTML, FETCH_CLIENT_ERROR):
+                    # Not an HTML page, or 404/410 - nothing to extract or follow, no browser render
+                    return False
+
+                if fetched and fetched.status == FETCH_OK:
+                    fetch_stats["static"] += 1
+                    # Text and links from one parse, off the event loop
+                    # (relative links resolve against the URL that was served, after redirects)
+                    base_url = fetched.url or current_url
+                    extracted = await extract_page_async(fetched.html, base_url if want_links else None)
+                    if needs_browser(fetched.html, extracted.text):
+                        fetch_stats["escalated"] += 1
+                    else:
+                        html_content = fetched.html
+                        text_content = extracted.text
+                        links = extracted.links
+                        validators = fetched.validators or {}
+
+            # 2. Escalate to Playwright only when needed
+            #    (no validators: a JS page's HTML shell can be unchanged while its content is not)
+            if html_content is None:
+                fetch_stats["browser"] += 1
+                html_content, final_url = await render_with_browser(current_url)
+                extracted = await extract_page_async(html_content, final_url if want_links else None)
+                text_content = extracted.text
+                links = extracted.links
+                validators = {}
+
+            # 🔥 즉시 임베딩 작업 큐에 추가 (메모리에 저장 안 함!)
+            # validators are recorded by the embedding task once the page is stored
+            if text_content.strip():
+                try:
+                    await asyncio.to_thread(queue_page_for_embedding, current_url, text_content, validators)
+                    logger.info(f"✅ Embedding queued for: {current_url}")
+                except Exception as embed_error:
+                    logger.warning(f"Failed to queue embedding for {current_url}: {str(embed_error)}")
+
+            # 통계용으로만 페이지 수를 셈 (URL과 텍스트는 저장 안 함)
+            pages_found += 1
+
+            logger.info(f"🌐 Crawled: {current_url}", depth=depth, total_found=pages_found)
+
+            if want_links:
+                # Keep the outbound links so a later 304 can still be followed; link-heavy pages
+                # are not stored (keeps the manifest small) and are fetched unconditionally instead
+                links = followable_links(current_url, links)
+                if len(links) <= settings.crawl_manifest_max_links:
+                    await asyncio.to_thread(url_manifest.update, current_url, links=links)
+                else:
+                    await asyncio.to_thread(url_manifest.clear, current_url, "links")
+                await enqueue_links(current_url, links, depth)
+
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to crawl {current_url}: {str(e)}")
+
+        return False
+
+    async def crawl_worker():
+        """Pull URLs from the shared BFS frontier until it is drained"""
+        nonlocal in_flight
+        while True:
+            item = await frontier_call(frontier.pop)
+            if item is None:
+                # Pages still loading (here or in other shards) may add more links
+                if in_flight == 0 and (shared_frontier is None or await frontier_call(shared_frontier.is_drained)):
+                    return
+                await asyncio.sleep(0.1 if shared_frontier is None else 1.0)
+                continue
+
+            current_url, depth = item
+            if depth > max_depth:
+                if tracker is not None:
+                    await frontier_call(tracker.mark_done, current_url)
+                continue
+
+            in_flight += 1
+            try:
+                requeued = await crawl_page(current_url, depth)
+                if tracker is not None and not requeued:
+                    await frontier_call(tracker.mark_done, current_url)
             finally:
-                await browser.close()
+                in_flight -= 1
+
+    completed = False
+    try:
+        if shared_frontier is not None:
+            # Shard of a distributed crawl: the coordinator already seeded the shared frontier
+            queued = await asyncio.to_thread(len, shared_frontier)
+            logger.info(f"🛰️ Joining distributed crawl {crawl_id}: {queued} URLs queued")
+        elif checkpoint is not None and checkpoint.resumed:
+            # Seeds and discovered links were stored with the checkpoint
+            logger.info(f"♻️ Resuming crawl {crawl_id}: {pages_found} pages done, {len(frontier)} queued")
+        elif seed_urls is not None:
+            seeds = list(seed_urls)
+            if discovery_mode == DISCOVERY_FEED:
+                # Pages the site reports as changed are revisited even when the schedule did not pick them
+                discovery = await discover_feed_urls(http_client, root_url)
+                if discovery is not None and discovery.changed_urls:
+                    logger.info(f"🗺️ {len(discovery.changed_urls)} changed URLs from sitemap/feed for {root_url}")
+                    seeds.extend(discovery.changed_urls)
+            logger.info(f"📅 Adaptive recrawl of {root_url}: {len(seeds)} scheduled pages")
+            frontier.add(root_url, 0)
+            for url in seeds:
+                frontier.add(url, 0)
+        else:
+            await seed_frontier(frontier, http_client, root_url, max_depth, discovery_mode)
+
+        workers = [asyncio.create_task(crawl_worker()) for _ in range(max(1, settings.crawl_concurrency))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            # One worker failing (or this crawl being cancelled) stops the others before cleanup
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        completed = True
+    finally:
+        await http_client.aclose()
+        if "context" in browser_state:
+            await browser_pool.release_context(browser_state["context"])
+        if checkpoint is not None:
+            # Keep the checkpoint only when a retry needs it
+            if completed:
+                checkpoint.discard()
+            else:
+                checkpoint.close()
+
+    # Remember whether this site is mostly server-rendered
+    if fetch_stats["static"]:
+        escalation_ratio = fetch_stats["escalated"] / fetch_stats["static"]
+        set_render_mode(
+            domain,
+            RENDER_MODE_BROWSER if escalation_ratio > 0.5 else RENDER_MODE_STATIC
+        )
 
-        logger.info(f"🌐 Crawl completed: {len(url_texts)} URLs found")
-        return url_texts
\ No newline at end of file
+    logger.info(f"🌐 Crawl completed: {pages_found} URLs found", **fetch_stats)
+    return pages_found
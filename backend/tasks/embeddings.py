@@ -1,20 +1,35 @@
 from celery import Task
 from celery_app import celery_app
+from celery_batches import Batches
 import httpx
-from bs4 import BeautifulSoup
 import structlog
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_ollama import OllamaEmbeddings
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    PointIdsList,
+    SetPayload,
+    SetPayloadOperation,
+    DeleteOperation,
+)
+from typing import List, Optional, Tuple
 import uuid
-import hashlib
 from datetime import datetime
 import pytz
-import time
-import random
+from urllib.parse import urlparse
 
 from config import settings
+from services.cache import bump_collection_version
+from services.semantic_cache import invalidate_cached_answers
+from services.url_manifest import url_manifest
+from services.page_fetcher import conditional_headers, response_validators
+from services.rate_limit import host_rate_limiter
+from services.page_store import content_hash, get_page_text, put_page_text
+from services.extraction import extract_page
+from services.chunking import get_chunker
+from services.chunk_lock import chunk_locks
 
 logger = structlog.get_logger()
 
@@ -45,13 +60,11 @@ embeddings = OllamaEmbeddings(
     base_url=settings.ollama_host
 )
 
-# 텍스트 분할기
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=settings.chunk_size,
-    chunk_overlap=settings.chunk_overlap,
-    length_function=len,
-    separators=["\n\n", "\n", ". ", " ", ""]
-)
+# 청크 저장소 포인트 ID 네임스페이스 (uuid5(chunk_hash))
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c2b7e-3d4a-5e8f-9a0b-1c2d3e4f5a6b")
+
+# 텍스트 분할기 (bge-m3 토큰 기준, 한국어 문장/게시판 구조 유지)
+text_splitter = get_chunker()
 
 
 @celery_app.task(base=EmbeddingTask, name="process_url_for_embedding")
@@ -65,49 +78,26 @@ def process_url_for_embedding(url: str):
         # Ensure collection exists
         ensure_collection_exists()
 
-        # Fetch and extract text
-        text_content = fetch_and_extract_text(url)
+        # Fetch and extract text (unconditionally - this is an explicit re-index)
+        text_content, validators = fetch_and_extract_text(url)
 
         if not text_content or len(text_content.strip()) < 50:
             logger.warning("Insufficient content", url=url, length=len(text_content))
             return {"status": "skipped", "url": url, "reason": "insufficient_content"}
 
-        # Split text into chunks
-        chunks = text_splitter.split_text(text_content)
-        logger.info(f"Split into {len(chunks)} chunks", url=url)
-
-        # Embed and store chunks
-        points = []
-        for idx, chunk in enumerate(chunks):
-            # Generate embedding
-            embedding = embeddings.embed_query(chunk)
-
-            # Create point
-            point_id = str(uuid.uuid4())
-            point = PointStruct(
-                id=point_id,
-                vector=embedding,
-                payload={
-                    "text": chunk,
-                    "url": url,
-                    "chunk_index": idx,
-                    "total_chunks": len(chunks),
-                    "updated_at": str(get_kst_now())
-                }
-            )
-            points.append(point)
+        # Chunk, embed (only unseen chunks) and store
+        stats = store_page(url, text_content)
+        url_manifest.update(url, **validators)
 
-        # Batch upload to Qdrant
-        qdrant_client.upsert(
-            collection_name=settings.qdrant_collection_name,
-            points=points
-        )
+        # Invalidate cached retrieval results in the API
+        bump_collection_version()
 
-        logger.info(f"Stored {len(points)} embeddings", url=url)
+        logger.info(f"Stored {stats['chunks']} chunks", url=url, **stats)
         return {
             "status": "success",
             "url": url,
-            "chunks_processed": len(chunks)
+            "chunks_processed": stats["chunks"],
+            "chunks_embedded": stats["embedded"]
         }
 
     except Exception as e:
@@ -115,6 +105,15 @@ def process_url_for_embedding(url: str):
         raise
 
 
+def embed_chunks(chunks: List[str]) -> List[List[float]]:
+    """Embed chunks through the batch document-embedding API (EMBEDDING_BATCH_SIZE per request)"""
+    vectors = []
+    batch_size = max(1, settings.embedding_batch_size)
+    for start in range(0, len(chunks), batch_size):
+        vectors.extend(embeddings.embed_documents(chunks[start:start + batch_size]))
+    return vectors
+
+
 def ensure_collection_exists():
     """Ensure Qdrant collection exists with proper configuration"""
     collections = qdrant_client.get_collections().collections
@@ -131,45 +130,34 @@ def ensure_collection_exists():
         logger.info("Created Qdrant collection", name=settings.qdrant_collection_name)
 
 
-def fetch_and_extract_text(url: str) -> str:
-    """Fetch URL content and extract text"""
+def fetch_and_extract_text(url: str, conditional: bool = False) -> Tuple[Optional[str], dict]:
+    """
+    Fetch URL content and extract text
+    Returns (text, validators); with conditional=True the stored ETag/Last-Modified
+    are sent and (None, {}) is returned when the server answers 304 Not Modified
+    """
     try:
-        # Add random delay to avoid overwhelming the server (1-3 seconds)
-        time.sleep(random.uniform(1.0, 3.0))
-
         # Fetch content
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
-        response = httpx.get(url, timeout=30, follow_redirects=True, headers=headers)
-        response.raise_for_status()
-
-        # Parse HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+        if conditional:
+            headers.update(conditional_headers(url_manifest.get(url)))
 
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
+        # Same per-host rate limit and backoff as the crawler
+        host = urlparse(url).netloc
+        with host_rate_limiter.hold(host):
+            response = httpx.get(url, timeout=30, follow_redirects=True, headers=headers)
+        host_rate_limiter.observe(host, response.status_code, response.headers.get("retry-after"))
 
-        # Try to find main content areas
-        main_content = None
-        for tag in ['main', 'article', 'div[role="main"]', '.content', '#content']:
-            main_content = soup.select_one(tag)
-            if main_content:
-                break
-
-        # If no main content found, use body
-        if not main_content:
-            main_content = soup.body if soup.body else soup
-
-        # Extract text
-        text = main_content.get_text(separator="\n", strip=True)
+        if response.status_code == 304:
+            return None, {}
+        response.raise_for_status()
 
-        # Clean up excessive whitespace
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        text = '\n'.join(lines)
+        # Same main-content extraction as the crawler
+        text = extract_page(response.text).text
 
-        return text
+        return text, response_validators(response)
 
     except Exception as e:
         logger.error("Failed to fetch/extract text", url=url, error=str(e))
@@ -178,6 +166,12 @@ def fetch_and_extract_text(url: str) -> str:
 
 def url_exists_in_db(url: str) -> bool:
     """Check if URL already exists in the database"""
+    # O(1) manifest lookup; Qdrant scroll only for URLs embedded before the manifest existed
+    # (the crawler also creates entries with only links, which are not indexed content)
+    entry = url_manifest.get(url)
+    if entry is not None and (entry.get("content_hash") or entry.get("point_ids")):
+        return True
+
     try:
         search_result = qdrant_client.scroll(
             collection_name=settings.qdrant_collection_name,
@@ -201,7 +195,7 @@ def url_exists_in_db(url: str) -> bool:
 
 def get_content_hash(text: str) -> str:
     """Generate hash of content for duplicate detection"""
-    return hashlib.md5(text.encode('utf-8')).hexdigest()
+    return content_hash(text)
 
 
 def content_changed_since_last_crawl(url: str, new_content: str) -> bool:
@@ -209,7 +203,12 @@ def content_changed_since_last_crawl(url: str, new_content: str) -> bool:
     try:
         new_hash = get_content_hash(new_content)
 
-        # Search for existing content with same URL
+        # O(1) manifest lookup first
+        entry = url_manifest.get(url)
+        if entry is not None and entry.get("content_hash"):
+            return new_hash != entry["content_hash"]
+
+        # Fallback: search for existing content with same URL
         search_result = qdrant_client.scroll(
             collection_name=settings.qdrant_collection_name,
             scroll_filter={
@@ -240,6 +239,274 @@ def content_changed_since_last_crawl(url: str, new_content: str) -> bool:
         return True  # Assume changed if error
 
 
+def get_chunk_point_id(chunk_hash: str) -> str:
+    """Content-addressed point ID: identical chunk text always maps to the same point"""
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, chunk_hash))
+
+
+def url_points_filter(url: str) -> dict:
+    """Points owned by (url) or shared with (urls) the given URL"""
+    return {
+        "should": [
+            {"key": "url", "match": {"value": url}},
+            {"key": "urls", "match": {"value": url}}
+        ]
+    }
+
+
+def get_url_points(url: str) -> list:
+    """Return every point that references a URL, with vectors"""
+    # Point IDs recorded in the manifest avoid a filtered scroll
+    entry = url_manifest.get(url)
+    if entry is not None and "point_ids" in entry:
+        if not entry["point_ids"]:
+            return []
+        return qdrant_client.retrieve(
+            collection_name=settings.qdrant_collection_name,
+            ids=entry["point_ids"],
+            with_payload=["url", "urls", "chunk_hash"],
+            with_vectors=True
+        )
+
+    points = []
+    offset = None
+    while True:
+        batch, offset = qdrant_client.scroll(
+            collection_name=settings.qdrant_collection_name,
+            scroll_filter=url_points_filter(url),
+            limit=256,
+            offset=offset,
+            with_payload=["url", "urls", "chunk_hash"],
+            with_vectors=True
+        )
+        points.extend(batch)
+
+        if offset is None:
+            break
+
+    return points
+
+
+def store_page(url: str, text_content: str) -> dict:
+    """Chunk a single page and write it to the chunk store (see store_pages)"""
+    return store_pages([(url, text_content)])[0]
+
+
+def store_pages(pages: List[Tuple[str, str]]) -> List[dict]:
+    """
+    Chunk pages and write them to the content-addressed chunk store
+    - Each unique chunk text is stored once (point ID = uuid5(chunk_hash)), so
+      re-embedding a page is an idempotent upsert
+    - Chunks already stored (by this or another URL) only get the URL added to `urls`
+    - Only chunks not seen anywhere in the corpus are embedded, in one batched
+      pass for all pages, followed by a single Qdrant upsert
+    - Stale references are pruned only after the new points are written, so a
+      page never disappears from search while it is being replaced
+    - The `urls`/`url` updates run under per-point Redis locks (services.chunk_lock),
+      so embedding workers sharing a chunk never lose each other's references
+    """
+    # The same URL queued twice in one batch: keep the latest text
+    latest_pages = dict(pages)
+
+    # 1. Chunk every page and load the points it currently references
+    planned = []
+    known_vectors = {}
+    previously_stored = {}  # url -> had points before (a content change, not a new page)
+    # One batched split (and token count) for every page in the batch
+    page_chunks = text_splitter.split_texts(list(latest_pages.values()))
+    for (url, text_content), chunks in zip(latest_pages.items(), page_chunks):
+
+        # chunk_hash -> (first index, text); duplicate chunks within a page are stored once
+        unique_chunks = {}
+        for idx, chunk in enumerate(chunks):
+            unique_chunks.setdefault(get_content_hash(chunk), (idx, chunk))
+
+        url_points = get_url_points(url)
+        previously_stored[url] = bool(url_points)
+        for point in url_points:
+            chunk_hash = (point.payload or {}).get("chunk_hash")
+            if chunk_hash and point.vector:
+                known_vectors[chunk_hash] = point.vector
+
+        new_ids = [get_chunk_point_id(chunk_hash) for chunk_hash in unique_chunks]
+        new_id_set = set(new_ids)
+        stale_ids = [str(point.id) for point in url_points if str(point.id) not in new_id_set]
+
+        planned.append((url, get_content_hash(text_content), len(chunks), unique_chunks, new_ids, stale_ids))
+
+    # 2. Embed chunks that are new to the whole corpus, before taking any lock
+    #    (vectors depend only on the chunk text, so this part needs no coordination)
+    all_ids = {point_id for plan in planned for point_id in plan[4]}
+    stored_ids = {
+        str(point.id)
+        for point in qdrant_client.retrieve(
+            collection_name=settings.qdrant_collection_name,
+            ids=list(all_ids),
+            with_payload=False,
+            with_vectors=False
+        )
+    }
+    to_embed = {}
+    for _, _, _, unique_chunks, _, _ in planned:
+        for chunk_hash, (_, chunk) in unique_chunks.items():
+            if (get_chunk_point_id(chunk_hash) not in stored_ids
+                    and chunk_hash not in known_vectors and chunk_hash not in to_embed):
+                to_embed[chunk_hash] = chunk
+    vectors = dict(known_vectors)
+    if to_embed:
+        vectors.update(zip(to_embed.keys(), embed_chunks(list(to_embed.values()))))
+
+    # 3. The shared `urls`/`url` payloads are read-modify-write: hold every touched point
+    #    (new and stale) so concurrent embedding workers cannot overwrite each other's references
+    lock_ids = all_ids | {point_id for plan in planned for point_id in plan[5]}
+    with chunk_locks.hold(lock_ids):
+        stats = write_chunk_references(planned, lock_ids, vectors, to_embed)
+
+    # Keep the URL manifest in sync with what was written
+    now = get_kst_now().isoformat()
+    url_manifest.update_many({
+        url: {
+            "content_hash": page_hash,
+            "chunk_count": total_chunks,
+            "point_ids": new_ids,
+            "last_crawled": now
+        }
+        for url, page_hash, total_chunks, _, new_ids, _ in planned
+    })
+    # Change history for adaptive recrawl scheduling
+    url_manifest.record_checks(previously_stored)
+
+    return [stats[url] for url, _ in pages]
+
+
+def write_chunk_references(planned: list, lock_ids: set, vectors: dict, embedded_hashes: dict) -> dict:
+    """
+    store_pages under the chunk locks: read the current `urls`/`url` of every touched point,
+    add this batch's URLs, upsert new points and prune stale references
+    """
+    existing = {
+        str(point.id): point.payload or {}
+        for point in qdrant_client.retrieve(
+            collection_name=settings.qdrant_collection_name,
+            ids=list(lock_ids),
+            with_payload=["url", "urls"],
+            with_vectors=False
+        )
+    }
+
+    # In-memory view of `urls`/`url` for existing points, shared by all pages in the batch
+    point_urls = {point_id: list(payload.get("urls", [])) for point_id, payload in existing.items()}
+    point_owner = {point_id: payload.get("url") for point_id, payload in existing.items()}
+    payload_updates = {}  # point_id -> payload fields to set
+
+    # Plan new points / URL additions across all pages
+    new_points = {}  # point_id -> (chunk_hash, payload)
+    counted = set()
+    stats = {}
+    for url, page_hash, total_chunks, unique_chunks, new_ids, _ in planned:
+        stored = 0
+        embedded = 0
+        for chunk_hash, (idx, chunk) in unique_chunks.items():
+            point_id = get_chunk_point_id(chunk_hash)
+            owner_payload = {
+                "chunk_index": idx,
+                "total_chunks": total_chunks,
+                "content_hash": page_hash,
+                "updated_at": str(get_kst_now())
+            }
+
+            if point_id in point_urls:
+                if url not in point_urls[point_id]:
+                    point_urls[point_id].append(url)
+                    payload_updates.setdefault(point_id, {})["urls"] = point_urls[point_id]
+                if point_owner[point_id] == url:
+                    # Chunk position / page hash may have moved within the page
+                    payload_updates.setdefault(point_id, {}).update(owner_payload)
+            elif point_id in new_points:
+                # Another page in this batch is storing the same chunk
+                urls = new_points[point_id][1]["urls"]
+                if url not in urls:
+                    urls.append(url)
+            else:
+                new_points[point_id] = (chunk_hash, {
+                    "text": chunk,
+                    "url": url,
+                    "urls": [url],
+                    "chunk_hash": chunk_hash,
+                    **owner_payload
+                })
+                stored += 1
+                if chunk_hash in embedded_hashes and chunk_hash not in counted:
+                    counted.add(chunk_hash)
+                    embedded += 1
+
+        stats[url] = {
+            "chunks": total_chunks,
+            "embedded": embedded,
+            "shared": len(unique_chunks) - stored,
+            "stored": stored,
+            "content_hash": page_hash
+        }
+
+    # A shared point deleted by another worker since step 2 of store_pages: embed it now
+    missing = {chunk_hash: payload["text"] for chunk_hash, payload in new_points.values() if chunk_hash not in vectors}
+    if missing:
+        vectors.update(zip(missing.keys(), embed_chunks(list(missing.values()))))
+
+    # Record old + new point IDs first, so a crash before the prune never orphans points
+    url_manifest.update_many({
+        url: {"point_ids": sorted(set(new_ids) | set(stale_ids))}
+        for url, _, _, _, new_ids, stale_ids in planned
+    })
+
+    if new_points:
+        qdrant_client.upsert(
+            collection_name=settings.qdrant_collection_name,
+            points=[
+                PointStruct(id=point_id, vector=vectors[chunk_hash], payload=payload)
+                for point_id, (chunk_hash, payload) in new_points.items()
+            ]
+        )
+
+    # Prune stale references: points no other URL uses are deleted,
+    # shared points keep the remaining URLs (ownership moves to the next URL)
+    delete_ids = []
+    for url, _, _, _, _, stale_ids in planned:
+        for point_id in stale_ids:
+            if point_id not in point_urls:
+                # Already deleted by another worker
+                continue
+
+            remaining = [u for u in point_urls[point_id] if u != url]
+            owner = point_owner[point_id]
+            if not remaining:
+                delete_ids.append(point_id)
+                payload_updates.pop(point_id, None)
+                continue
+
+            point_urls[point_id] = remaining
+            point_owner[point_id] = remaining[0] if owner == url else owner
+            update = payload_updates.setdefault(point_id, {})
+            update["urls"] = remaining
+            if owner == url:
+                update["url"] = remaining[0]
+
+    operations = [
+        SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[point_id]))
+        for point_id, payload in payload_updates.items()
+    ]
+    if delete_ids:
+        operations.append(DeleteOperation(delete=PointIdsList(points=delete_ids)))
+
+    if operations:
+        qdrant_client.batch_update_points(
+            collection_name=settings.qdrant_collection_name,
+            update_operations=operations
+        )
+
+    return stats
+
+
 @celery_app.task(base=EmbeddingTask, name="process_url_for_embedding_incremental")
 def process_url_for_embedding_incremental(url: str):
     """
@@ -256,101 +523,207 @@ def process_url_for_embedding_incremental(url: str):
     return process_url_for_embedding(url)
 
 
+def prepare_page_for_embedding(
+    url: str,
+    text_content: Optional[str],
+    validators: Optional[dict] = None,
+    text_ref: Optional[str] = None
+) -> Tuple[Optional[str], dict, Optional[dict]]:
+    """
+    Fetch (if needed) and validate a page before embedding
+    Returns (text_content, validators, None) when the page should be embedded,
+    or (None, validators, skip_result) when it can be skipped
+    text_ref is the page store hash of the crawled text; an already indexed hash is
+    skipped without reading the text
+    Validators (ETag/Last-Modified) must only be written to the manifest once the
+    page content is indexed, otherwise a later 304 would hide a failed embedding
+    """
+    validators = validators or {}
+
+    if text_ref is not None:
+        entry = url_manifest.get(url)
+        if entry is not None and entry.get("content_hash") == text_ref:
+            logger.info("Content hash already indexed, skipping", url=url)
+            url_manifest.update(url, last_crawled=get_kst_now().isoformat(), **validators)
+            url_manifest.record_checks({url: False})
+            return None, validators, {"status": "skipped", "url": url, "reason": "content_unchanged"}
+
+        # Purged or unreadable text falls back to fetching the page below
+        text_content = get_page_text(text_ref)
+
+    # Use provided text_content if available (from crawling), otherwise fetch
+    if text_content is None:
+        logger.info("No cached text, fetching from URL", url=url)
+        text_content, validators = fetch_and_extract_text(url, conditional=True)
+        if text_content is None:
+            logger.info("Not modified (304), skipping", url=url)
+            url_manifest.update(url, last_crawled=get_kst_now().isoformat())
+            url_manifest.record_checks({url: False})
+            return None, validators, {"status": "skipped", "url": url, "reason": "not_modified"}
+    else:
+        logger.info("Using cached text from crawling", url=url, text_length=len(text_content))
+
+    if not text_content or len(text_content.strip()) < 50:
+        logger.warning("Insufficient content", url=url, length=len(text_content))
+        return None, validators, {"status": "skipped", "url": url, "reason": "insufficient_content"}
+
+    # Check if content actually changed
+    if not content_changed_since_last_crawl(url, text_content):
+        logger.info("Content unchanged, skipping", url=url)
+        # Indexed content matches this response, so its validators are safe to keep
+        url_manifest.update(url, last_crawled=get_kst_now().isoformat(), **validators)
+        url_manifest.record_checks({url: False})
+        return None, validators, {"status": "skipped", "url": url, "reason": "content_unchanged"}
+
+    # Content changed or new URL - process it
+    logger.info("Content changed or new URL, processing", url=url)
+    return text_content, validators, None
+
+
+def embedding_success_result(url: str, stats: dict) -> dict:
+    """Task result for a page that was (re-)embedded"""
+    return {
+        "status": "success",
+        "url": url,
+        "chunks_processed": stats["chunks"],
+        "chunks_embedded": stats["embedded"],
+        "content_hash": stats["content_hash"]
+    }
+
+
 @celery_app.task(base=EmbeddingTask, name="process_url_for_embedding_smart")
-def process_url_for_embedding_smart(url: str, text_content: str = None):
+def process_url_for_embedding_smart(
+    url: str,
+    text_content: str = None,
+    validators: dict = None,
+    text_ref: str = None
+):
     """
     Process URL with smart duplicate detection based on content changes
-    If text_content is provided (from crawling), use it directly to avoid re-fetching
+    If text_content (or text_ref, its page store hash) is provided by the crawler,
+    use it directly to avoid re-fetching
+    validators (etag/last_modified of the crawled response) are recorded once stored
     """
     logger.info("Processing URL with smart duplicate detection", url=url)
 
     try:
-        # Use provided text_content if available (from crawling), otherwise fetch
-        if text_content is None:
-            logger.info("No cached text, fetching from URL", url=url)
-            text_content = fetch_and_extract_text(url)
-        else:
-            logger.info("Using cached text from crawling", url=url, text_length=len(text_content))
+        text_content, validators, skipped = prepare_page_for_embedding(url, text_content, validators, text_ref)
+        if skipped:
+            return skipped
 
-        if not text_content or len(text_content.strip()) < 50:
-            logger.warning("Insufficient content", url=url, length=len(text_content))
-            return {"status": "skipped", "url": url, "reason": "insufficient_content"}
+        # Ensure collection exists
+        ensure_collection_exists()
 
-        # Check if content actually changed
-        if not content_changed_since_last_crawl(url, text_content):
-            logger.info("Content unchanged, skipping", url=url)
-            return {"status": "skipped", "url": url, "reason": "content_unchanged"}
+        # Chunk, embed (only unseen chunks) and store
+        stats = store_page(url, text_content)
+        url_manifest.update(url, **validators)
 
-        # Content changed or new URL - process it
-        logger.info("Content changed or new URL, processing", url=url)
+        # Invalidate cached retrieval results and answers citing this URL
+        bump_collection_version()
+        invalidate_cached_answers(qdrant_client, url)
 
-        # Ensure collection exists
-        ensure_collection_exists()
+        logger.info(f"Updated {stats['chunks']} chunks", url=url, **stats)
+        return embedding_success_result(url, stats)
+
+    except Exception as e:
+        logger.error("Failed to process URL", url=url, error=str(e))
+        raise
+
+
+@celery_app.task(
+    base=Batches,
+    name="process_url_for_embedding_smart_batch",
+    flush_every=settings.embedding_consumer_batch_size,
+    flush_interval=settings.embedding_consumer_flush_interval_ms / 1000,
+    acks_late=True
+)
+def process_url_for_embedding_smart_batch(requests):
+    """
+    Micro-batching variant of process_url_for_embedding_smart
+    Collects up to EMBEDDING_CONSUMER_BATCH_SIZE messages (or waits
+    EMBEDDING_CONSUMER_FLUSH_INTERVAL_MS), embeds all new chunks in one batched
+    Ollama pass and writes them with one Qdrant upsert. Each message gets its own
+    result and is acked individually after the batch is written.
+    """
+    backend = process_url_for_embedding_smart_batch.backend
+    pages = []
+    ready = []
+    page_validators = []
+
+    for request in requests:
+        url = request.args[0] if request.args else request.kwargs["url"]
+        text_content = request.args[1] if len(request.args) > 1 else request.kwargs.get("text_content")
+        validators = request.args[2] if len(request.args) > 2 else request.kwargs.get("validators")
+        text_ref = request.args[3] if len(request.args) > 3 else request.kwargs.get("text_ref")
 
-        # Remove old content for this URL if exists
         try:
-            qdrant_client.delete(
-                collection_name=settings.qdrant_collection_name,
-                points_selector={
-                    "filter": {
-                        "must": [
-                            {
-                                "key": "url",
-                                "match": {
-                                    "value": url
-                                }
-                            }
-                        ]
-                    }
-                }
-            )
-            logger.info("Removed old content for URL", url=url)
+            text_content, validators, skipped = prepare_page_for_embedding(url, text_content, validators, text_ref)
         except Exception as e:
-            logger.warning(f"Could not remove old content: {e}")
+            # Same as a failed store: the single-page task retries it with the regular policy
+            logger.error("Failed to prepare URL, requeueing it individually", url=url, error=str(e))
+            process_url_for_embedding_smart.delay(url, text_content, validators, text_ref)
+            backend.mark_as_done(request.id, {"status": "requeued", "url": url}, request=request)
+            continue
 
-        # Split text into chunks
-        chunks = text_splitter.split_text(text_content)
-        logger.info(f"Split into {len(chunks)} chunks", url=url)
+        if skipped:
+            backend.mark_as_done(request.id, skipped, request=request)
+            continue
 
-        # Generate content hash
-        content_hash = get_content_hash(text_content)
+        pages.append((url, text_content))
+        ready.append(request)
+        page_validators.append(validators)
 
-        # Embed and store chunks
-        points = []
-        for idx, chunk in enumerate(chunks):
-            # Generate embedding
-            embedding = embeddings.embed_query(chunk)
-
-            # Create point with content hash
-            point_id = str(uuid.uuid4())
-            point = PointStruct(
-                id=point_id,
-                vector=embedding,
-                payload={
-                    "text": chunk,
-                    "url": url,
-                    "chunk_index": idx,
-                    "total_chunks": len(chunks),
-                    "content_hash": content_hash,
-                    "updated_at": str(get_kst_now())
-                }
-            )
-            points.append(point)
+    if not pages:
+        return
 
-        # Batch upload to Qdrant
-        qdrant_client.upsert(
-            collection_name=settings.qdrant_collection_name,
-            points=points
-        )
+    try:
+        ensure_collection_exists()
+        all_stats = store_pages(pages)
+    except Exception as e:
+        # Fall back to one task per page so the regular retry policy applies
+        logger.error("Batch embedding failed, requeueing pages individually", pages=len(pages), error=str(e))
+        for (url, text_content), request, validators in zip(pages, ready, page_validators):
+            inline_text, text_ref = offload_page_text(text_content)
+            process_url_for_embedding_smart.delay(url, inline_text, validators, text_ref)
+            backend.mark_as_done(request.id, {"status": "requeued", "url": url}, request=request)
+        return
+
+    url_manifest.update_many({
+        url: validators
+        for (url, _), validators in zip(pages, page_validators)
+        if validators
+    })
+    bump_collection_version()
+
+    for (url, _), request, stats in zip(pages, ready, all_stats):
+        invalidate_cached_answers(qdrant_client, url)
+        backend.mark_as_done(request.id, embedding_success_result(url, stats), request=request)
+
+    logger.info(
+        f"Batch embedded {len(pages)} pages",
+        pages=len(pages),
+        chunks=sum(stats["chunks"] for stats in all_stats),
+        embedded=sum(stats["embedded"] for stats in all_stats)
+    )
+
+
+def offload_page_text(text_content: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (inline text, page store hash) for an embedding message
+    The text only travels inline when the page store is unavailable
+    """
+    if text_content is None:
+        return None, None
 
-        logger.info(f"Updated {len(points)} embeddings", url=url)
-        return {
-            "status": "success",
-            "url": url,
-            "chunks_processed": len(chunks),
-            "content_hash": content_hash
-        }
+    text_ref = put_page_text(text_content)
+    if text_ref is None:
+        return text_content, None
+    return None, text_ref
 
-    except Exception as e:
-        logger.error("Failed to process URL", url=url, error=str(e))
-        raise
\ No newline at end of file
+
+def queue_page_for_embedding(url: str, text_content: str = None, validators: dict = None):
+    """Queue a page on the embedding queue (batching consumer when enabled)"""
+    inline_text, text_ref = offload_page_text(text_content)
+    if settings.embedding_consumer_batching:
+        return process_url_for_embedding_smart_batch.delay(url, inline_text, validators, text_ref)
+    return process_url_for_embedding_smart.delay(url, inline_text, validators, text_ref)
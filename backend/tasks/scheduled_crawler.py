@@ -1,13 +1,14 @@
 """
 Scheduled crawler tasks for folder-based crawling
 """
-import asyncio
+from typing import List, Optional
 import structlog
-from celery import Task
+from celery import Task, chord
 from celery_app import celery_app
 from supabase_client import supabase
 from tasks.crawler import crawl_async
-from tasks.embeddings import process_url_for_embedding_smart
+from services.browser_pool import run_on_worker_loop
+from services.recrawl import RECRAWL_ADAPTIVE, select_recrawl_urls
 from config import settings
 
 logger = structlog.get_logger()
@@ -62,87 +63,110 @@ def crawl_folder_sites(folder_id: str, folder_name: str):
                 "message": "No enabled sites to crawl"
             }
 
-        # 2. 각 사이트 크롤링
-        loop = asyncio.get_event_loop()
-        if loop.is_closed():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        total_urls_found = 0
-        total_embedding_tasks_queued = 0
-        successful_sites = 0
-        failed_sites = 0
-        site_details = []
-
-        for site_index, site in enumerate(sites, 1):
-            site_name = site["name"]
-            site_url = site["url"]
-
-            logger.info(f"🔍 [{site_index}/{len(sites)}] Crawling site: {site_name} ({site_url})")
-
-            try:
-                # Async crawl
-                urls = loop.run_until_complete(
-                    crawl_async(site_url, settings.max_crawl_depth)
-                )
-
-                urls_count = len(urls)
-                total_urls_found += urls_count
-
-                logger.info(f"✅ [{site_index}/{len(sites)}] Found {urls_count} URLs from {site_name}")
-
-                # Queue embedding tasks
-                embedding_tasks_queued = 0
-                for url in urls:
-                    try:
-                        task = process_url_for_embedding_smart.delay(url)
-                        embedding_tasks_queued += 1
-                    except Exception as e:
-                        logger.warning(f"Failed to queue embedding task for {url}: {e}")
-
-                total_embedding_tasks_queued += embedding_tasks_queued
-
-                successful_sites += 1
-                site_details.append({
-                    "site_name": site_name,
-                    "site_url": site_url,
-                    "urls_found": urls_count,
-                    "embedding_tasks_queued": embedding_tasks_queued,
-                    "status": "success"
-                })
-
-            except Exception as e:
-                failed_sites += 1
-                logger.error(f"❌ [{site_index}/{len(sites)}] Failed to crawl {site_name}: {str(e)}")
-                site_details.append({
-                    "site_name": site_name,
-                    "site_url": site_url,
-                    "urls_found": 0,
-                    "embedding_tasks_queued": 0,
-                    "status": "failed",
-                    "error": str(e)
-                })
-
-        # 3. 결과 반환
-        result = {
-            "status": "completed",
+        # 2. 적응형 재크롤링: 변경 빈도 기반으로 폴더 예산만큼 다시 방문할 URL 선택
+        recrawl_selection = None
+        if settings.recrawl_mode == RECRAWL_ADAPTIVE:
+            folder_response = supabase.table("crawl_folders").select("recrawl_budget").eq("id", folder_id).execute()
+            budget = (folder_response.data[0].get("recrawl_budget") if folder_response.data else None) \
+                or settings.recrawl_default_budget
+            recrawl_selection = select_recrawl_urls(folder_id, [site["url"] for site in sites], budget)
+
+        # 3. 사이트별 크롤링 서브태스크로 분배 (크롤러 워커들이 병렬 처리), 완료 후 결과 집계
+        #    각 페이지는 crawl_async가 추출한 텍스트와 함께 임베딩 큐에 한 번만 들어갑니다
+        header = [
+            crawl_folder_site.s(
+                folder_id,
+                site,
+                recrawl_selection.get(site["url"]) if recrawl_selection else None
+            )
+            for site in sites
+        ]
+        chord_result = chord(header)(aggregate_folder_crawl.s(folder_id, folder_name))
+
+        logger.info(
+            f"🚀 Dispatched {len(sites)} site crawls for folder '{folder_name}'",
+            chord_id=chord_result.id
+        )
+
+        return {
+            "status": "dispatched",
             "folder_id": folder_id,
             "folder_name": folder_name,
             "total_sites": len(sites),
-            "successful_sites": successful_sites,
-            "failed_sites": failed_sites,
-            "total_urls_found": total_urls_found,
-            "total_embedding_tasks_queued": total_embedding_tasks_queued,
-            "site_details": site_details
+            "aggregate_task_id": chord_result.id
         }
 
-        logger.info(
-            f"✅ Folder '{folder_name}' crawl completed",
-            result=result
+    except Exception as e:
+        logger.error(f"❌ Failed to crawl folder '{folder_name}': {str(e)}")
+        raise
+
+
+@celery_app.task(base=ScheduledCrawlerTask, name="crawl_folder_site")
+def crawl_folder_site(folder_id: str, site: dict, seed_urls: Optional[List[str]] = None):
+    """
+    Crawl one site of a scheduled folder (chord header task)
+    Never raises, so a failing site does not prevent the folder result from being aggregated
+
+    Args:
+        folder_id: UUID of the folder
+        site: scheduled_crawl_sites row
+        seed_urls: Pages selected by adaptive recrawl (None for a full discovery crawl)
+    """
+    site_name = site["name"]
+    site_url = site["url"]
+    logger.info(f"🔍 Crawling site: {site_name} ({site_url})", folder_id=folder_id)
+
+    try:
+        # Sites without change history yet get a full discovery crawl
+        pages_found = run_on_worker_loop(
+            crawl_async(
+                site_url,
+                settings.max_crawl_depth,
+                site.get("resource_allowlist"),
+                settings.crawl_discovery_mode,
+                seed_urls=seed_urls
+            )
         )
 
-        return result
+        logger.info(f"✅ Found {pages_found} URLs from {site_name}", folder_id=folder_id)
+        return {
+            "site_name": site_name,
+            "site_url": site_url,
+            "urls_found": pages_found,
+            "status": "success"
+        }
 
     except Exception as e:
-        logger.error(f"❌ Failed to crawl folder '{folder_name}': {str(e)}")
-        raise
+        logger.error(f"❌ Failed to crawl {site_name}: {str(e)}", folder_id=folder_id)
+        return {
+            "site_name": site_name,
+            "site_url": site_url,
+            "urls_found": 0,
+            "status": "failed",
+            "error": str(e)
+        }
+
+
+@celery_app.task(base=ScheduledCrawlerTask, name="aggregate_folder_crawl")
+def aggregate_folder_crawl(site_details: List[dict], folder_id: str, folder_name: str):
+    """
+    Combine the per-site results of a folder crawl (chord callback)
+    """
+    successful_sites = sum(1 for detail in site_details if detail["status"] == "success")
+    result = {
+        "status": "completed",
+        "folder_id": folder_id,
+        "folder_name": folder_name,
+        "total_sites": len(site_details),
+        "successful_sites": successful_sites,
+        "failed_sites": len(site_details) - successful_sites,
+        "total_urls_found": sum(detail["urls_found"] for detail in site_details),
+        "site_details": site_details
+    }
+
+    logger.info(
+        f"✅ Folder '{folder_name}' crawl completed",
+        result=result
+    )
+
+    return result
@@ -76,6 +76,7 @@ CREATE TABLE IF NOT EXISTS crawl_folders (
     schedule_time TIME NOT NULL,
     schedule_day INTEGER CHECK (schedule_day IS NULL OR (schedule_day >= 0 AND schedule_day <= 6)),
     max_depth INTEGER NOT NULL DEFAULT 2 CHECK (max_depth >= 1 AND max_depth <= 5),
+    recrawl_budget INTEGER CHECK (recrawl_budget IS NULL OR recrawl_budget >= 1),  -- 적응형 재크롤링 1회 페이지 예산 (NULL이면 기본값)
     enabled BOOLEAN DEFAULT true,
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW()
@@ -89,11 +90,16 @@ CREATE TABLE IF NOT EXISTS scheduled_crawl_sites (
     url TEXT NOT NULL,
     description TEXT,
     enabled BOOLEAN DEFAULT true,
+    resource_allowlist TEXT[] NOT NULL DEFAULT '{}',  -- 크롤러 브라우저에서 차단하지 않을 리소스 타입/호스트
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW(),
     UNIQUE(folder_id, url)
 );
 
+-- 기존 테이블용 컬럼 추가
+ALTER TABLE crawl_folders ADD COLUMN IF NOT EXISTS recrawl_budget INTEGER CHECK (recrawl_budget IS NULL OR recrawl_budget >= 1);
+ALTER TABLE scheduled_crawl_sites ADD COLUMN IF NOT EXISTS resource_allowlist TEXT[] NOT NULL DEFAULT '{}';
+
 -- 3-3. 크롤링 테이블 인덱스 생성 (성능 최적화)
 CREATE INDEX IF NOT EXISTS idx_crawl_folders_enabled ON crawl_folders(enabled);
 CREATE INDEX IF NOT EXISTS idx_scheduled_crawl_sites_folder_id ON scheduled_crawl_sites(folder_id);